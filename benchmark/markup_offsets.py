@@ -0,0 +1,123 @@
+"""Time building a markup Document's offset maps from one diff, with
+`SpanUpdater.pair`, against the two diffs used before.
+
+Runs on the HTML and XML opinions in bulk-file.csv.bz2 if it is present, as
+in benchmark.py, and otherwise on generated HTML and XML documents:
+
+    python benchmark/markup_offsets.py [--limit 500]
+"""
+
+import argparse
+import bz2
+import csv
+import re
+import sys
+import time
+from io import StringIO
+from pathlib import Path
+
+from eyecite.annotate import SpanUpdater
+from eyecite.clean import clean_text
+from eyecite.utils import placeholder_markup
+
+csv.field_size_limit(sys.maxsize)
+
+root = Path(__file__).parent.absolute()
+
+MARKUP_COLUMNS = {
+    "xml_harvard": "xml",
+    "html_lawbox": "html",
+    "html_columbia": "html",
+    "html_anon_2020": "html",
+    "html": "html",
+}
+
+PARAGRAPH = (
+    "In <i>Foo v. Bar</i>, 1 U.S. 1, 2 (1999), the court held that "
+    "<em>Baz</em>, 2 F.2d 3  was  overruled. <i>Id.</i> at 4.  See "
+    '<span class="citation">Qux, supra, at 5</span>.\n'
+)
+
+
+def load_fixtures(limit: int) -> list[tuple[str, str]]:
+    """Return (kind, markup) pairs from bulk-file.csv.bz2, or generated
+    documents if it isn't present."""
+    path = root / "bulk-file.csv.bz2"
+    if not path.exists():
+        print(f"{path.name} not found, using generated documents")
+        return [
+            (
+                "html",
+                "<html><body>"
+                + "".join(f"<p>{PARAGRAPH}</p>" for _ in range(size))
+                + "</body></html>",
+            )
+            for size in (10, 100, 300)
+        ] + [
+            (
+                "xml",
+                "<opinion>"
+                + "".join(
+                    f'<p id="b{i}-{i}">{PARAGRAPH}</p>' for i in range(size)
+                )
+                + "</opinion>",
+            )
+            for size in (10, 100, 300)
+        ]
+
+    fixtures = []
+    with bz2.open(path, "rt") as csv_file:
+        for row in csv.DictReader(StringIO(csv_file.read())):
+            for column, kind in MARKUP_COLUMNS.items():
+                if row.get(column):
+                    text = re.sub(r"^<\?xml.*?\?>", "", row[column], count=1)
+                    fixtures.append((kind, text))
+                    break
+            if len(fixtures) >= limit:
+                break
+    return fixtures
+
+
+def time_maps(markup_text: str) -> tuple[float, float]:
+    """Return the seconds taken to build both offset maps with two diffs
+    and with one."""
+    plain_text = clean_text(markup_text, ["html", "inline_whitespace"])
+    placeholder = placeholder_markup(markup_text)
+
+    start = time.perf_counter()
+    SpanUpdater(plain_text, placeholder)
+    SpanUpdater(markup_text, plain_text)
+    two_diffs = time.perf_counter() - start
+
+    start = time.perf_counter()
+    SpanUpdater.pair(plain_text, placeholder)
+    one_diff = time.perf_counter() - start
+    return two_diffs, one_diff
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--limit", type=int, default=500, help="maximum number of documents"
+    )
+    args = parser.parse_args()
+
+    totals: dict[str, list[float]] = {}
+    for kind, markup_text in load_fixtures(args.limit):
+        two_diffs, one_diff = time_maps(markup_text)
+        total = totals.setdefault(kind, [0, 0.0, 0.0])
+        total[0] += 1
+        total[1] += two_diffs
+        total[2] += one_diff
+
+    for kind, (count, two_diffs, one_diff) in sorted(totals.items()):
+        print(
+            f"{kind}: {int(count)} documents, "
+            f"two diffs {two_diffs * 1000:.1f}ms, "
+            f"one diff {one_diff * 1000:.1f}ms "
+            f"({two_diffs / one_diff:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
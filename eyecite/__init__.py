@@ -1,8 +1,12 @@
 # Import extended functionality
 from . import models_extended, tokenizers_extended
-from .annotate import annotate_citations
+from .annotate import (
+    annotate_citations,
+    annotate_document,
+    iter_annotated_text,
+)
 from .clean import clean_text
-from .find import get_citations
+from .find import count_citations, get_citations
 from .models_extended import (
     AttorneyGeneralCitation,
     BaseCitation,
@@ -14,7 +18,7 @@ from .models_extended import (
     ScientificIdentifierCitation,
     SessionLawCitation,
 )
-from .resolve import resolve_citations
+from .resolve import resolve_citations, resolve_citations_batch
 from .tokenizers_extended import (
     AttorneyGeneralOpinionsTokenizer,
     ExtendedCitationTokenizer,
@@ -27,9 +31,13 @@ from .tokenizers_extended import (
 
 __all__ = [
     "annotate_citations",
+    "annotate_document",
+    "iter_annotated_text",
+    "count_citations",
     "get_citations",
     "clean_text",
     "resolve_citations",
+    "resolve_citations_batch",
     # Extended functionality
     "models_extended",
     "tokenizers_extended",
@@ -1,21 +1,33 @@
+import struct
+import sys
+from array import array
 from bisect import bisect_left, bisect_right
-from collections.abc import Callable, Iterable
+from collections.abc import Callable, Iterable, Iterator
 from difflib import SequenceMatcher
-from functools import partial
 from logging import getLogger
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import fast_diff_match_patch
 
 from eyecite.utils import (
+    HtmlTagIndex,
     is_balanced_html,
     maybe_balance_style_tags,
     placeholder_markup,
     wrap_html_tags,
 )
 
+if TYPE_CHECKING:
+    from eyecite.models import Document
+
 logger = getLogger(__name__)
 
+# Build a HtmlTagIndex to check spans for unbalanced tags once there are at
+# least this many spans containing tags per "<" in the text. Indexing costs
+# about a third as much per tag as parsing each span costs per span, so
+# below this parsing the spans is faster.
+TAG_INDEX_MIN_TAGGED_SPANS_PER_TAG = 0.75
+
 
 class SpanUpdater:
     """Helper object to shift offsets from text_before to text_after.
@@ -31,39 +43,176 @@ class SpanUpdater:
     Offset 8 has moved to offset 10:
     >>> updater.update(8)
     10
+
+    Many offsets can be translated at once, which is faster than calling
+    update() for each:
+    >>> updater.update_many([8, 1])
+    [10, 1]
     """
 
+    # kinds of ranges: offsets in a SHIFT range are shifted by the range's
+    # delta, and offsets in a REPLACE range are replaced by its start plus
+    # its delta
+    SHIFT = 0
+    REPLACE = 1
+
     def __init__(self, text_before, text_after, use_dmp=True):
-        """To set up, we need to populate self.offsets and self.updaters:
-            >>> SpanUpdater(text_before, text_after).offsets
-            [0, 4]
-            >>> SpanUpdater(text_before, text_after).updaters
-            [partial(shift_offset, delta=0), partial(shift_offset, delta=4)]
+        """To set up, we need to populate self.offsets, self.deltas and
+        self.kinds, parallel lists describing each range of offsets:
+            >>> updater = SpanUpdater(text_before, text_after)
+            >>> updater.offsets, updater.deltas, list(updater.kinds)
+            ([0, 4], [0, 4], [0, 0])
         This indicates that offsets 0 to 4 need to be shifted by 0,
-        and offsets 4 and up need to be shifted by 4.
+        and offsets 4 and up need to be shifted by 4 (both ranges are of
+        kind SHIFT). Offsets in a REPLACE range were deleted, and all move
+        to the start of the range plus its delta.
+        """
+        get_diff_steps = (
+            self.get_diff_steps if use_dmp else self.get_diff_steps_builtin
+        )
+        self._set_ranges(get_diff_steps(text_before, text_after))
+
+    @classmethod
+    def from_diff_steps(cls, diff_steps) -> "SpanUpdater":
+        """Create a SpanUpdater from diff steps, as returned by
+        get_diff_steps(), instead of diffing two strings."""
+        updater = cls.__new__(cls)
+        updater._set_ranges(diff_steps)
+        return updater
+
+    @classmethod
+    def pair(
+        cls, text_before, text_after, use_dmp=True
+    ) -> tuple["SpanUpdater", "SpanUpdater"]:
+        """Return SpanUpdaters from text_before to text_after and from
+        text_after back to text_before, computed from a single diff:
+            >>> forward, backward = SpanUpdater.pair(text_before, text_after)
+            >>> backward.update(10, bisect_right)
+            6
+        Offsets outside changed ranges map the same way as with a separate
+        SpanUpdater(text_after, text_before). Offsets inside them may not,
+        since a diff aligns whitespace next to a change differently
+        depending on its direction.
+        """
+        get_diff_steps = (
+            cls.get_diff_steps if use_dmp else cls.get_diff_steps_builtin
+        )
+        return cls.pair_from_diff_steps(
+            list(get_diff_steps(text_before, text_after))
+        )
+
+    @classmethod
+    def pair_from_diff_steps(
+        cls, diff_steps
+    ) -> tuple["SpanUpdater", "SpanUpdater"]:
+        """Return SpanUpdaters for both directions of a list of diff steps,
+        as returned by pair()."""
+        return (
+            cls.from_diff_steps(diff_steps),
+            cls.from_diff_steps(cls.invert_diff_steps(diff_steps)),
+        )
+
+    @staticmethod
+    def invert_diff_steps(diff_steps):
+        """Turn steps from a into b into steps from b into a, by swapping
+        insertions and deletions:
+            >>> list(SpanUpdater.invert_diff_steps(
+            ...     [("=", 3), ("-", 2), ("+", 3), ("=", 2)]
+            ... ))
+            [('=', 3), ('-', 3), ('+', 2), ('=', 2)]
+        Within each run of changes, deletions are yielded before insertions,
+        as the diff would order them.
         """
+        deleted = inserted = 0
+        for operation, amount in diff_steps:
+            if operation == "=":
+                if deleted:
+                    yield "-", deleted
+                if inserted:
+                    yield "+", inserted
+                deleted = inserted = 0
+                yield operation, amount
+            elif operation == "+":
+                deleted += amount
+            else:  # operation == '-'
+                inserted += amount
+        if deleted:
+            yield "-", deleted
+        if inserted:
+            yield "+", inserted
 
-        # helpers for the two kinds of updates we need to apply to offsets:
-        def shift_offset(offset, delta):
-            return offset + delta
+    # header of the serialized form: a magic string with a format version,
+    # and the number of ranges
+    SERIALIZED_HEADER = struct.Struct("<4sI")
+    SERIALIZED_MAGIC = b"ESU1"
+
+    def to_bytes(self) -> bytes:
+        """Serialize the ranges of this SpanUpdater, to be loaded with
+        from_bytes(), so that later runs or other processes can translate
+        offsets without diffing the texts again:
+            >>> SpanUpdater.from_bytes(updater.to_bytes()).update(8)
+            10
+        The ranges are stored as little-endian 64-bit offsets and deltas,
+        followed by a byte for the kind of each range.
+        """
+        offsets = array("q", self.offsets)
+        deltas = array("q", self.deltas)
+        if sys.byteorder == "big":
+            offsets.byteswap()
+            deltas.byteswap()
+        return b"".join(
+            [
+                self.SERIALIZED_HEADER.pack(
+                    self.SERIALIZED_MAGIC, len(self.offsets)
+                ),
+                offsets.tobytes(),
+                deltas.tobytes(),
+                bytes(self.kinds),
+            ]
+        )
 
-        def replace_offset(offset, new_offset):
-            return new_offset
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SpanUpdater":
+        """Load a SpanUpdater serialized by to_bytes()."""
+        header_size = cls.SERIALIZED_HEADER.size
+        try:
+            magic, count = cls.SERIALIZED_HEADER.unpack_from(data)
+        except struct.error as e:
+            raise ValueError("Not a serialized SpanUpdater") from e
+        if magic != cls.SERIALIZED_MAGIC:
+            raise ValueError("Not a serialized SpanUpdater")
+        # an offset and a delta of 8 bytes each, and a kind byte per range
+        if len(data) != header_size + count * 17:
+            raise ValueError("Serialized SpanUpdater is truncated")
+        offsets = array("q")
+        offsets.frombytes(data[header_size : header_size + count * 8])
+        deltas = array("q")
+        deltas.frombytes(
+            data[header_size + count * 8 : header_size + count * 16]
+        )
+        if sys.byteorder == "big":
+            offsets.byteswap()
+            deltas.byteswap()
+        updater = cls.__new__(cls)
+        updater.offsets = offsets.tolist()
+        updater.deltas = deltas.tolist()
+        updater.kinds = bytearray(data[header_size + count * 16 :])
+        return updater
 
-        # diff the two strings and set self.offsets and self.updaters:
+    def _set_ranges(self, diff_steps):
+        """Set self.offsets, self.deltas and self.kinds from diff steps."""
         offset = 0
         delta = 0
         self.offsets = offsets = []
-        self.updaters = updaters = []
-        get_diff_steps = (
-            self.get_diff_steps if use_dmp else self.get_diff_steps_builtin
-        )
-        for operation, amount in get_diff_steps(text_before, text_after):
+        self.deltas = deltas = []
+        self.kinds = kinds = bytearray()
+        for operation, amount in diff_steps:
             if operation == "=":
                 # start a new range with a relative delta,
                 # and push the offset forward
                 offsets.append(offset)
-                updaters.append(partial(shift_offset, delta=delta))
+                deltas.append(delta)
+                kinds.append(self.SHIFT)
                 offset += amount
             elif operation == "+":
                 # push the delta forward
@@ -72,9 +221,8 @@ class SpanUpdater:
                 # Start a new range with an absolute delta.
                 # Push the offset forward and delta backward.
                 offsets.append(offset)
-                updaters.append(
-                    partial(replace_offset, new_offset=offset + delta)
-                )
+                deltas.append(delta)
+                kinds.append(self.REPLACE)
                 offset += amount
                 delta -= amount
 
@@ -117,8 +265,29 @@ class SpanUpdater:
     def update(self, offset, bisect):
         """Shift an offset left or right."""
         index = bisect(self.offsets, offset) - 1
-        updater = self.updaters[index]
-        return updater(offset)
+        if self.kinds[index] == self.REPLACE:
+            return self.offsets[index] + self.deltas[index]
+        return offset + self.deltas[index]
+
+    def update_many(self, offsets, bisect=bisect_right):
+        """Shift a list of offsets left or right, returning a list of the
+        shifted offsets in the same order. The offsets are visited in sorted
+        order, so each range lookup only searches past the previous one."""
+        range_starts = self.offsets
+        deltas = self.deltas
+        kinds = self.kinds
+        replace = self.REPLACE
+        results = list(offsets)
+        lo = 0
+        for i in sorted(range(len(results)), key=results.__getitem__):
+            offset = results[i]
+            lo = bisect(range_starts, offset, lo)
+            index = lo - 1
+            if kinds[index] == replace:
+                results[i] = range_starts[index] + deltas[index]
+            else:
+                results[i] = offset + deltas[index]
+        return results
 
 
 def annotate_citations(
@@ -129,6 +298,8 @@ def annotate_citations(
     use_dmp: bool = True,
     annotator: Callable[[Any, str, Any], str] | None = None,
     offset_updater: SpanUpdater | None = None,
+    clean_steps: Iterable[str | Callable[[str], str]] | None = None,
+    tag_index: HtmlTagIndex | None = None,
 ) -> str:
     """Given a list of citations and the text from which they were parsed,
     insert annotations into the text surrounding each citation. This could be
@@ -172,9 +343,125 @@ def annotate_citations(
         offset_updater: If provided, use this SpanUpdater. Citation finding
             for HTML / XML sources use a SpanUpdater called `plain_to_markup`
             to find citations, passing it saves this expensive instantiation.
+        clean_steps: If provided, the steps that cleaned `source_text` into
+            `plain_text`. Offsets are then tracked through the built-in
+            regex steps instead of diffing the whole text; other steps, such
+            as `html`, are still diffed.
+        tag_index: If provided, a HtmlTagIndex of the text being annotated,
+            used to check spans for unbalanced tags without parsing them.
+            Passing it saves rebuilding the index when annotating the same
+            text more than once; otherwise one is built when many spans
+            contain tags.
     Returns:
         The annotated text.
     """
+    return "".join(
+        iter_annotated_text(
+            plain_text,
+            annotations,
+            source_text=source_text,
+            unbalanced_tags=unbalanced_tags,
+            use_dmp=use_dmp,
+            annotator=annotator,
+            offset_updater=offset_updater,
+            clean_steps=clean_steps,
+            tag_index=tag_index,
+        )
+    )
+
+
+def annotate_document(
+    document: "Document",
+    annotations: Iterable[tuple[tuple[int, int], Any, Any]],
+    unbalanced_tags: str = "unchecked",
+    annotator: Callable[[Any, str, Any], str] | None = None,
+    tag_index: HtmlTagIndex | None = None,
+) -> str:
+    """Same as `annotate_citations`, for citations found in a `Document`,
+    such as the `document` shared by the citations returned by
+    `get_citations`. The document's source text is annotated, reusing the
+    offset maps built while finding the citations instead of diffing the
+    texts again:
+
+    >>> citations = get_citations(markup_text=html, clean_steps=["html"])
+    >>> annotate_document(
+    ...     citations[0].document,
+    ...     [(c.span(), "<a>", "</a>") for c in citations],
+    ... )
+
+    For markup, the document's `plain_to_markup` map is used. If it's
+    missing, as for documents built from both plain and markup text, it's
+    built once and stored on the document. For cleaned plain text, offsets
+    are tracked through the document's `clean_steps`.
+
+    Args:
+        document: The document the citations were found in.
+        annotations: The annotations, as for `annotate_citations`, with
+            spans in the document's `plain_text`.
+        unbalanced_tags: See `annotate_citations`.
+        annotator: See `annotate_citations`.
+        tag_index: See `annotate_citations`.
+
+    Returns:
+        The annotated source text.
+    """
+    if document.markup_text:
+        if document.plain_to_markup is None:
+            document.plain_to_markup, document.markup_to_plain = (
+                SpanUpdater.pair(
+                    document.plain_text,
+                    placeholder_markup(document.markup_text),
+                )
+            )
+        return annotate_citations(
+            document.plain_text,
+            annotations,
+            source_text=document.markup_text,
+            unbalanced_tags=unbalanced_tags,
+            annotator=annotator,
+            offset_updater=document.plain_to_markup,
+            tag_index=tag_index,
+        )
+    return annotate_citations(
+        document.plain_text,
+        annotations,
+        source_text=document.source_text,
+        unbalanced_tags=unbalanced_tags,
+        annotator=annotator,
+        clean_steps=document.clean_steps or [],
+        tag_index=tag_index,
+    )
+
+
+def iter_annotated_text(
+    plain_text: str,
+    annotations: Iterable[tuple[tuple[int, int], Any, Any]],
+    source_text: str = "",
+    unbalanced_tags: str = "unchecked",
+    use_dmp: bool = True,
+    annotator: Callable[[Any, str, Any], str] | None = None,
+    offset_updater: SpanUpdater | None = None,
+    clean_steps: Iterable[str | Callable[[str], str]] | None = None,
+    tag_index: HtmlTagIndex | None = None,
+    presorted: bool = False,
+) -> Iterator[str]:
+    """Same as `annotate_citations`, but yield the annotated text in chunks
+    instead of joining them into one string, so that it can be written out
+    as it is produced:
+
+    >>> with open("annotated.html", "w") as f:
+    ...     f.writelines(iter_annotated_text(plain_text, annotations))
+
+    Args:
+        presorted: If `True`, the annotations are already sorted by their
+            positions, as `annotate_citations` would sort them. They are
+            then consumed one at a time as the text is written, instead of
+            being collected and sorted first.
+        See `annotate_citations` for the other arguments.
+
+    Returns:
+        An iterator of chunks of the annotated text.
+    """
     if unbalanced_tags not in ["unchecked", "skip", "wrap"]:
         raise ValueError(f"Unknown option '{unbalanced_tags}")
 
@@ -183,21 +470,100 @@ def annotate_citations(
         plain_text = source_text
     elif source_text and source_text != plain_text:
         placeholder_text = placeholder_markup(source_text)
-        offset_updater = SpanUpdater(
-            plain_text, placeholder_text, use_dmp=use_dmp
-        )
+        if clean_steps is not None:
+            from eyecite.clean import clean_text_with_diff
+
+            cleaned_text, diff_steps = clean_text_with_diff(
+                source_text, clean_steps, placeholder_text
+            )
+            if cleaned_text == plain_text:
+                offset_updater = SpanUpdater.from_diff_steps(
+                    SpanUpdater.invert_diff_steps(diff_steps)
+                )
+        if offset_updater is None:
+            offset_updater = SpanUpdater(
+                plain_text, placeholder_text, use_dmp=use_dmp
+            )
         plain_text = source_text
 
-    # append text for each annotation to out
+    if presorted:
+        if offset_updater:
+            updater = offset_updater
+            annotations = (
+                (
+                    (
+                        updater.update(start, bisect_right),
+                        updater.update(end, bisect_left),
+                    ),
+                    before,
+                    after,
+                )
+                for (start, end), before, after in annotations
+            )
+    else:
+        annotations = _sorted_annotations(annotations, offset_updater)
+
+        # check spans with an index of the text's tags if there are enough
+        # spans containing tags to make indexing them worthwhile
+        if tag_index is None and unbalanced_tags != "unchecked":
+            tagged_spans = sum(
+                1
+                for (start, end), _, _ in annotations
+                if plain_text.find("<", start, end) >= 0
+                or plain_text.find(">", start, end) >= 0
+            )
+            if tagged_spans and tagged_spans >= (
+                plain_text.count("<") * TAG_INDEX_MIN_TAGGED_SPANS_PER_TAG
+            ):
+                tag_index = HtmlTagIndex(plain_text)
+
+    return _iter_annotated_chunks(
+        plain_text, annotations, unbalanced_tags, annotator, tag_index
+    )
+
+
+def _sorted_annotations(
+    annotations: Iterable[tuple[tuple[int, int], Any, Any]],
+    offset_updater: SpanUpdater | None,
+) -> list[tuple[tuple[int, int], Any, Any]]:
+    """Sort annotations, moving their offsets with offset_updater if given."""
     annotations = sorted(annotations)
-    out = []
+
+    # if we're applying to source_text, update offsets
+    if offset_updater:
+        starts = offset_updater.update_many(
+            [start for (start, end), before, after in annotations],
+            bisect_right,
+        )
+        ends = offset_updater.update_many(
+            [end for (start, end), before, after in annotations],
+            bisect_left,
+        )
+        annotations = [
+            ((start, end), before, after)
+            for start, end, (_, before, after) in zip(
+                starts, ends, annotations
+            )
+        ]
+    return annotations
+
+
+def _iter_annotated_chunks(
+    plain_text: str,
+    annotations: Iterable[tuple[tuple[int, int], Any, Any]],
+    unbalanced_tags: str,
+    annotator: Callable[[Any, str, Any], str] | None,
+    tag_index: HtmlTagIndex | None,
+) -> Iterator[str]:
+    """Yield the text between sorted annotations and the annotated spans."""
+
+    def is_balanced(start: int, end: int) -> bool:
+        if tag_index is not None:
+            return tag_index.is_balanced(start, end)
+        return is_balanced_html(plain_text[start:end])
+
     last_end = 0
     for (start, end), before, after in annotations:
-        # if we're applying to source_text, update offsets
-        if offset_updater:
-            start = offset_updater.update(start, bisect_right)
-            end = offset_updater.update(end, bisect_left)
-
         # handle overlaps
         if start < last_end:
             # include partial annotation if possible
@@ -211,15 +577,15 @@ def annotate_citations(
         # handle HTML tags
         if unbalanced_tags == "unchecked":
             pass
-        elif not is_balanced_html(span_text):
+        elif not is_balanced(start, end):
             if unbalanced_tags == "wrap":
                 span_text = wrap_html_tags(span_text, after, before)
             else:  # "skip" case
                 original_span_text = span_text
                 start, end, span_text = maybe_balance_style_tags(
-                    start, end, plain_text
+                    start, end, plain_text, tag_index=tag_index
                 )
-                if not is_balanced_html(span_text):
+                if not is_balanced(start, end):
                     logger.warning(
                         "Citation was not annotated due to unbalanced tags %s",
                         original_span_text,
@@ -231,17 +597,12 @@ def annotate_citations(
         else:
             annotated_span = before + span_text + after
 
-        # append each span
-        out.extend(
-            [
-                plain_text[last_end:start],
-                annotated_span,
-            ]
-        )
+        # yield each span
+        if start > last_end:
+            yield plain_text[last_end:start]
+        yield annotated_span
         last_end = end
 
-    # append text after final citation
+    # yield text after final citation
     if last_end < len(plain_text):
-        out.append(plain_text[last_end:])
-
-    return "".join(out)
+        yield plain_text[last_end:]
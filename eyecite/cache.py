@@ -0,0 +1,311 @@
+import hashlib
+import inspect
+import io
+import json
+import operator
+import os
+import pickle
+import sqlite3
+import sys
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from functools import cache
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Any
+
+from eyecite.annotate import SpanUpdater
+from eyecite.models import CitationBase, Document
+
+# Bump this if the format of cached values changes, so that stale entries
+# are ignored rather than misread.
+CACHE_FORMAT_VERSION = 2
+
+
+class CacheBackend(ABC):
+    """Base class for `eyecite.find.get_citations` cache backends. A backend
+    is a simple key-value store of bytes; subclasses must implement get()
+    and set().
+
+    Cached values are pickles, so only point a persistent backend at a
+    location that is writeable by trusted users.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> bytes | None:
+        """Return the value stored for key, or None if it is missing."""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes) -> None:
+        """Store value for key."""
+
+
+class MemoryCache(CacheBackend):
+    """In-memory least-recently-used cache. Entries are evicted once the
+    total size of the stored values exceeds max_size bytes."""
+
+    def __init__(self, max_size: int = 64 * 1024 * 1024):
+        self.max_size = max_size
+        self.size = 0
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_size:
+            # would evict everything else and still not fit
+            return
+        with self._lock:
+            old_value = self._entries.pop(key, None)
+            if old_value is not None:
+                self.size -= len(old_value)
+            self._entries[key] = value
+            self.size += len(value)
+            while self.size > self.max_size:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+
+class SQLiteCache(CacheBackend):
+    """Persistent cache stored in a single SQLite database file."""
+
+    def __init__(self, path: str | os.PathLike):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS citations "
+                "(key TEXT PRIMARY KEY, value BLOB NOT NULL)"
+            )
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM citations WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: bytes) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO citations (key, value) VALUES (?, ?)",
+                (key, value),
+            )
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        self._connection.close()
+
+
+class DirectoryCache(CacheBackend):
+    """Persistent cache storing one file per entry in a directory. Files are
+    sharded into subdirectories by the first two characters of their key."""
+
+    def __init__(self, path: str | os.PathLike):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def _entry_path(self, key: str) -> Path:
+        return self.path / key[:2] / key
+
+    def get(self, key: str) -> bytes | None:
+        try:
+            return self._entry_path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key: str, value: bytes) -> None:
+        entry_path = self._entry_path(key)
+        entry_path.parent.mkdir(exist_ok=True)
+        # write to a temporary file first so that concurrent readers never
+        # see a partially written entry
+        fd, tmp_path = tempfile.mkstemp(dir=entry_path.parent)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(value)
+            os.replace(tmp_path, entry_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+@cache
+def _package_versions() -> dict[str, str]:
+    """Versions of the packages whose data affects extraction results."""
+    versions = {}
+    for package in ["eyecite", "reporters-db", "courts-db"]:
+        try:
+            versions[package] = version(package)
+        except PackageNotFoundError:
+            versions[package] = "unknown"
+    return versions
+
+
+def _step_name(step: str | Callable[[str], str]) -> str | None:
+    """Identify a clean step by name, or by the import path of a module-level
+    function. Returns None for other callables, such as lambdas, closures
+    and partials, which can't be told apart by name."""
+    if isinstance(step, str):
+        return step
+    if not inspect.isfunction(step) or "<" in step.__qualname__:
+        return None
+    module = sys.modules.get(step.__module__)
+    if getattr(module, step.__qualname__, None) is not step:
+        return None
+    return f"{step.__module__}.{step.__qualname__}"
+
+
+def _tokenizer_fingerprint(tokenizer: Any) -> str:
+    """Identify a tokenizer by its class and the regexes of its extractors.
+    The fingerprint is cached on the tokenizer, since hashing thousands of
+    regexes on every call would defeat the purpose of caching, and is
+    recomputed if the tokenizer's extractors are replaced."""
+    extractors = tuple(getattr(tokenizer, "extractors", None) or ())
+    cached = getattr(tokenizer, "_cache_fingerprint", None)
+    if (
+        cached is not None
+        and len(cached[0]) == len(extractors)
+        and all(map(operator.is_, cached[0], extractors))
+    ):
+        cached_fingerprint: str = cached[1]
+        return cached_fingerprint
+
+    tokenizer_class = type(tokenizer)
+    fingerprint = hashlib.sha256(
+        f"{tokenizer_class.__module__}.{tokenizer_class.__qualname__}".encode()
+    )
+    for extractor in extractors:
+        fingerprint.update(f"{extractor.regex}\0{extractor.flags}\0".encode())
+    tokenizer._cache_fingerprint = (extractors, fingerprint.hexdigest())
+    return fingerprint.hexdigest()
+
+
+def cache_key(
+    plain_text: str,
+    markup_text: str,
+    remove_ambiguous: bool,
+    tokenizer: Any,
+    clean_steps: Iterable[str | Callable[[str], str]] | None,
+) -> str | None:
+    """Return the key under which the result of a `get_citations` call is
+    cached: a hash of its arguments, plus the versions of eyecite and of the
+    databases it relies on. Returns None if the call can't be cached because
+    a clean step is a callable other than a module-level function."""
+    step_names = [_step_name(step) for step in clean_steps or []]
+    if None in step_names:
+        return None
+    params = {
+        "format": CACHE_FORMAT_VERSION,
+        "remove_ambiguous": remove_ambiguous,
+        "tokenizer": _tokenizer_fingerprint(tokenizer),
+        "clean_steps": step_names,
+        "versions": _package_versions(),
+    }
+    key = hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf8"))
+    for text in [plain_text, markup_text]:
+        text_bytes = (text or "").encode("utf8")
+        key.update(len(text_bytes).to_bytes(8, "big"))
+        key.update(text_bytes)
+    return key.hexdigest()
+
+
+class _CitationPickler(pickle.Pickler):
+    """Pickler that stores references to the shared Document instead of the
+    Document itself, which holds the full token list."""
+
+    def __init__(self, file, document: Document):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.document = document
+
+    def persistent_id(self, obj):
+        if obj is self.document:
+            return "document"
+        return None
+
+
+class _CitationUnpickler(pickle.Unpickler):
+    """Unpickler that swaps the Document reference back in."""
+
+    def __init__(self, file, document: Document):
+        super().__init__(file)
+        self.document = document
+
+    def persistent_load(self, pid):
+        if pid == "document":
+            return self.document
+        raise pickle.UnpicklingError(f"Unknown persistent id {pid}")
+
+
+def dump_citations(citations: list[CitationBase], document: Document) -> bytes:
+    """Serialize the result of a `get_citations` call for caching. The
+    document's text and offset maps are kept, but not its tokens."""
+    offset_maps = None
+    if document.plain_to_markup and document.markup_to_plain:
+        offset_maps = (
+            document.plain_to_markup.to_bytes(),
+            document.markup_to_plain.to_bytes(),
+        )
+    document_state = {
+        "plain_text": document.plain_text,
+        "markup_text": document.markup_text,
+        "source_text": document.source_text,
+        "clean_steps": [
+            step
+            for step in document.clean_steps or []
+            if isinstance(step, str)
+        ],
+        "emphasis_tags": document.emphasis_tags,
+        "offset_maps": offset_maps,
+    }
+    out = io.BytesIO()
+    pickle.dump(
+        (CACHE_FORMAT_VERSION, document_state),
+        out,
+        protocol=pickle.HIGHEST_PROTOCOL,
+    )
+    _CitationPickler(out, document).dump(citations)
+    return out.getvalue()
+
+
+def load_citations(data: bytes) -> list[CitationBase] | None:
+    """Rebuild the citations stored by dump_citations, without tokenizing
+    the text again. The citations share a Document holding the plain,
+    markup and source text and the offset maps of markup, but no tokens.
+    Returns None if the data was stored in a different format version."""
+    data_file = io.BytesIO(data)
+    format_version, document_state = pickle.load(data_file)
+    if format_version != CACHE_FORMAT_VERSION:
+        return None
+    if not document_state["plain_text"]:
+        # cleaning removed all text, so there can't be any citations
+        return []
+
+    # Passing both texts skips cleaning and diffing
+    document = Document(
+        plain_text=document_state["plain_text"],
+        markup_text=document_state["markup_text"],
+    )
+    document.source_text = document_state["source_text"]
+    document.clean_steps = document_state["clean_steps"]
+    document.emphasis_tags = document_state["emphasis_tags"]
+    if document_state["offset_maps"]:
+        plain_to_markup, markup_to_plain = document_state["offset_maps"]
+        document.plain_to_markup = SpanUpdater.from_bytes(plain_to_markup)
+        document.markup_to_plain = SpanUpdater.from_bytes(markup_to_plain)
+    citations: list[CitationBase] = _CitationUnpickler(
+        data_file, document
+    ).load()
+    return citations
@@ -1,7 +1,18 @@
 import re
-from collections.abc import Callable, Iterable
+from collections.abc import Callable, Iterable, Iterator
+from functools import lru_cache, partial
+from os.path import commonprefix
+from typing import IO
 
 import lxml.html
+from lxml import etree
+
+from eyecite.annotate import SpanUpdater
+
+# Steps to turn one text into another, in the format returned by
+# `eyecite.annotate.SpanUpdater.get_diff_steps`: ("=", n) keeps n
+# characters, ("-", n) deletes n characters and ("+", n) inserts n.
+DiffSteps = list[tuple[str, int]]
 
 
 def clean_text(text, steps: Iterable[str | Callable[[str], str]]) -> str:
@@ -19,19 +30,62 @@ def clean_text(text, steps: Iterable[str | Callable[[str], str]]) -> str:
     Returns:
         The cleaned text.
     """
+    return compile_clean_steps(steps)(text)
+
+
+def compile_clean_steps(
+    steps: Iterable[str | Callable[[str], str]],
+) -> Callable[[str], str]:
+    """Compile a list of cleaning steps, as accepted by `clean_text`, into a
+    single function. Runs of consecutive steps from `fusable_cleaners`, such
+    as `["inline_whitespace", "underscores"]`, are merged into one
+    substitution pass, which gives the same output as applying them in turn
+    without copying the whole text for each step.
+
+    Args:
+        steps: Any `Iterable` (e.g., a list) of cleaning functions to apply.
+
+    Returns:
+        A function taking a text and returning the cleaned text.
+    """
+    step_funcs: list[Callable[[str], str]] = []
+    fusable_run: list[str] = []
+
+    def end_fusable_run():
+        if len(fusable_run) > 1:
+            step_funcs.append(_fused_cleaner(tuple(fusable_run)))
+        elif fusable_run:
+            step_funcs.append(cleaners_lookup[fusable_run[0]])
+        fusable_run.clear()
+
     for step in steps:
+        if isinstance(step, str) and step in fusable_cleaners:
+            fusable_run.append(step)
+            continue
+        end_fusable_run()
         if step in cleaners_lookup:
-            step_func = cleaners_lookup[step]  # type: ignore
+            step_funcs.append(cleaners_lookup[step])  # type: ignore
         elif callable(step):
-            step_func = step
+            step_funcs.append(step)
         else:
             raise ValueError(
                 "clean_text steps must be callable "
                 f"or one of {list(cleaners_lookup.keys())}"
             )
-        text = step_func(text)
+    end_fusable_run()
+
+    def clean(text: str) -> str:
+        for step_func in step_funcs:
+            text = step_func(text)
+        return text
+
+    return clean
+
 
-    return text  # type: ignore
+INLINE_WHITESPACE_REGEX = re.compile(r"[ \t]+")
+ALL_WHITESPACE_REGEX = re.compile(r"[\u200b\s]+")
+UNDERSCORES_REGEX = re.compile(r"__+")
+XML_DECLARATION_REGEX = re.compile(r"^<\?xml.*?\?>")
 
 
 def html(html_content: str) -> str:
@@ -56,6 +110,103 @@ def html(html_content: str) -> str:
     return " ".join(text)
 
 
+# parents whose text `html` leaves out
+HIDDEN_TEXT_PARENTS = {"style", "link", "head", "page-number", "script"}
+
+# characters of markup fed to the parser at a time by `iter_html_text`
+HTML_CHUNK_SIZE = 64 * 1024
+
+
+def iter_html_text(
+    html_content: str | bytes | Iterable[str | bytes] | IO,
+) -> Iterator[str]:
+    """Streaming version of `html`, which yields the visible text of HTML
+    markup as it is parsed instead of building the whole document tree, so
+    that memory use is bounded for very large documents. Joining the chunks
+    gives the same text as `html`:
+
+    >>> "".join(iter_html_text("<p>foo <i>bar</i></p>"))
+    'foo  bar'
+
+    Args:
+        html_content: The HTML string, a file-like object open for reading,
+            or an iterable of chunks of markup.
+
+    Returns:
+        An iterator of chunks of visible text.
+    """
+    if isinstance(html_content, (str, bytes)):
+        chunks: Iterable[str | bytes] = (
+            html_content[i : i + HTML_CHUNK_SIZE]
+            for i in range(0, len(html_content), HTML_CHUNK_SIZE)
+        )
+    elif hasattr(html_content, "read"):
+        read = partial(html_content.read, HTML_CHUNK_SIZE)
+        chunks = iter(lambda: read() or None, None)
+    else:
+        chunks = html_content
+
+    parser = etree.HTMLPullParser(events=("start", "end", "comment", "pi"))
+    # Each text node is complete once the next node starts, or its parent
+    # ends: an element's text when its first child starts, and a child's
+    # tail when its next sibling starts. Open elements are tracked on a
+    # stack of [element, last child seen].
+    stack: list[list] = []
+    separator = ""
+
+    def visible(text: str | None, parent) -> bool:
+        return bool(
+            text
+            and text.strip()
+            and not (
+                isinstance(parent.tag, str)
+                and parent.tag in HIDDEN_TEXT_PARENTS
+            )
+        )
+
+    def start_child() -> Iterator[str]:
+        nonlocal separator
+        if not stack:
+            return
+        parent, last_child = stack[-1]
+        text = parent.text if last_child is None else last_child.tail
+        if visible(text, parent):
+            yield separator + text
+            separator = " "
+
+    def end_child(element) -> None:
+        if stack:
+            stack[-1][1] = element
+            # drop finished children that have no text left to yield
+            parent = stack[-1][0]
+            while parent[0] is not element:
+                del parent[0]
+        element.clear(keep_tail=True)
+
+    def read_events() -> Iterator[str]:
+        nonlocal separator
+        for event, element in parser.read_events():
+            if event == "start":
+                yield from start_child()
+                stack.append([element, None])
+            elif event == "end":
+                _, last_child = stack.pop()
+                text = element.text if last_child is None else last_child.tail
+                if visible(text, element):
+                    yield separator + text
+                    separator = " "
+                end_child(element)
+            else:  # comments and processing instructions
+                yield from start_child()
+                end_child(element)
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from read_events()
+    parser.close()
+    yield from read_events()
+
+
 def inline_whitespace(text: str) -> str:
     """Collapse multiple spaces or tabs within a string into one space
     character.
@@ -66,7 +217,7 @@ def inline_whitespace(text: str) -> str:
     Returns:
         Text with collapsed spaces and tabs.
     """
-    return re.sub(r"[ \t]+", " ", text)
+    return INLINE_WHITESPACE_REGEX.sub(" ", text)
 
 
 def all_whitespace(text: str) -> str:
@@ -79,7 +230,7 @@ def all_whitespace(text: str) -> str:
     Returns:
         Text with collapsed whitespace characters.
     """
-    return re.sub(r"[\u200b\s]+", " ", text)
+    return ALL_WHITESPACE_REGEX.sub(" ", text)
 
 
 def underscores(text: str) -> str:
@@ -92,7 +243,7 @@ def underscores(text: str) -> str:
     Returns:
         Text without underscores.
     """
-    return re.sub(r"__+", "", text)
+    return UNDERSCORES_REGEX.sub("", text)
 
 
 def xml(text: str) -> str:
@@ -107,7 +258,7 @@ def xml(text: str) -> str:
     Returns:
         Text without xml opening tag.
     """
-    return re.sub(r"^<\?xml.*?\?>", "", text, count=1)
+    return XML_DECLARATION_REGEX.sub("", text, count=1)
 
 
 cleaners_lookup: dict[str, Callable[[str], str]] = {
@@ -117,3 +268,196 @@ cleaners_lookup: dict[str, Callable[[str], str]] = {
     "underscores": underscores,
     "xml": xml,
 }
+
+# Cleaners that are a single regex substitution, as (regex, replacement,
+# count). Their edits are known from the regex matches, so their diff steps
+# can be tracked without diffing.
+regex_cleaners: dict[str, tuple[re.Pattern, str, int]] = {
+    "inline_whitespace": (INLINE_WHITESPACE_REGEX, " ", 0),
+    "all_whitespace": (ALL_WHITESPACE_REGEX, " ", 0),
+    "underscores": (UNDERSCORES_REGEX, "", 0),
+    "xml": (XML_DECLARATION_REGEX, "", 1),
+}
+
+
+# Cleaners in `regex_cleaners` that only rewrite runs of certain characters,
+# given as the contents of a regex character class, into strings of the same
+# characters. Consecutive steps among these are fused by
+# `compile_clean_steps`.
+fusable_cleaners: dict[str, str] = {
+    "inline_whitespace": r" \t",
+    "all_whitespace": r"\u200b\s",
+    "underscores": "_",
+}
+
+# number of distinct runs of characters whose cleaned text is remembered by
+# each fused cleaner
+FUSED_RUN_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=128)
+def _fused_cleaner(step_names: tuple[str, ...]) -> Callable[[str], str]:
+    """Fuse a run of `fusable_cleaners` into one substitution pass.
+
+    Every match of these steps falls within a run of the union of their
+    characters, and their replacements are made of those characters too, so
+    the text between runs is never changed and runs never merge. Applying
+    the steps in turn to each maximal run therefore gives the same result as
+    applying them to the whole text. Lone spaces, which none of the steps
+    change, are skipped.
+    """
+    chars = "".join(fusable_cleaners[name] for name in step_names)
+    run_regex = re.compile(f"(?! (?![{chars}]))[{chars}]+")
+    steps = [regex_cleaners[name] for name in step_names]
+
+    @lru_cache(maxsize=FUSED_RUN_CACHE_SIZE)
+    def clean_run(run: str) -> str:
+        for regex, replacement, count in steps:
+            run = regex.sub(replacement, run, count)
+        return run
+
+    def fused(text: str) -> str:
+        return run_regex.sub(lambda match: clean_run(match[0]), text)
+
+    return fused
+
+
+def _add_diff_step(diff_steps: DiffSteps, operation: str, amount: int):
+    """Append a step, merging it into the last step if they match."""
+    if not amount:
+        return
+    if diff_steps and diff_steps[-1][0] == operation:
+        diff_steps[-1] = (operation, diff_steps[-1][1] + amount)
+    else:
+        diff_steps.append((operation, amount))
+
+
+def _sub_with_diff(
+    regex: re.Pattern, replacement: str, text: str, count: int = 0
+) -> tuple[str, DiffSteps]:
+    """Same as `regex.sub(replacement, text, count)` for a literal
+    replacement, but also return the diff steps from text to the result.
+    Any common prefix of a match and its replacement is kept rather than
+    replaced, as a diff would."""
+    parts = []
+    diff_steps: DiffSteps = []
+    last_end = 0
+    for i, match in enumerate(regex.finditer(text)):
+        if count and i == count:
+            break
+        start, end = match.span()
+        kept = len(commonprefix([match[0], replacement]))
+        parts.append(text[last_end:start])
+        parts.append(replacement)
+        _add_diff_step(diff_steps, "=", start - last_end + kept)
+        _add_diff_step(diff_steps, "-", end - start - kept)
+        _add_diff_step(diff_steps, "+", len(replacement) - kept)
+        last_end = end
+    parts.append(text[last_end:])
+    _add_diff_step(diff_steps, "=", len(text) - last_end)
+    return "".join(parts), diff_steps
+
+
+def compose_diff_steps(first: DiffSteps, second: DiffSteps) -> DiffSteps:
+    """Given diff steps from a to b and from b to c, return the diff steps
+    from a to c.
+
+    Args:
+        first: Diff steps from a to b.
+        second: Diff steps from b to c.
+
+    Returns:
+        Diff steps from a to c.
+    """
+    composed: DiffSteps = []
+    first_steps = iter(first)
+    second_steps = iter(second)
+    op1, n1 = next(first_steps, ("", 0))
+    op2, n2 = next(second_steps, ("", 0))
+    while n1 or n2:
+        if op1 == "-" or not n2:
+            # characters of a that never reach b
+            _add_diff_step(composed, op1, n1)
+            op1, n1 = next(first_steps, ("", 0))
+        elif op2 == "+" or not n1:
+            # characters of c that aren't in b
+            _add_diff_step(composed, op2, n2)
+            op2, n2 = next(second_steps, ("", 0))
+        else:
+            # characters of b, kept or inserted by first and kept or
+            # deleted by second
+            amount = min(n1, n2)
+            if op1 == "=" and op2 == "=":
+                _add_diff_step(composed, "=", amount)
+            elif op1 == "=":
+                _add_diff_step(composed, "-", amount)
+            elif op2 == "=":
+                _add_diff_step(composed, "+", amount)
+            n1 -= amount
+            n2 -= amount
+            if not n1:
+                op1, n1 = next(first_steps, ("", 0))
+            if not n2:
+                op2, n2 = next(second_steps, ("", 0))
+    return composed
+
+
+def clean_text_with_diff(
+    text: str,
+    steps: Iterable[str | Callable[[str], str]],
+    diff_text: str | None = None,
+) -> tuple[str, DiffSteps]:
+    """Same as `clean_text`, but also return the diff steps from text to the
+    cleaned text. The edits of the steps in `regex_cleaners` are tracked as
+    they are applied; the output of other steps, such as `html` or custom
+    callables, is diffed against their input.
+
+    Args:
+        text: The text to clean.
+        steps: Any `Iterable` (e.g., a list) of cleaning functions to apply.
+        diff_text: If provided, a text with the same offsets as `text`,
+            such as `eyecite.utils.placeholder_markup(text)`, to diff against
+            instead of `text` when the first step isn't tracked.
+
+    Returns:
+        The cleaned text, and the diff steps from text to the cleaned text.
+    """
+    diff_steps: DiffSteps = [("=", len(text))] if text else []
+    # input of a run of untracked steps, which is diffed once the run ends
+    untracked_text: str | None = None
+    for step in steps:
+        if isinstance(step, str) and step in regex_cleaners:
+            if untracked_text is not None:
+                diff_steps = _diff_untracked(
+                    diff_steps, untracked_text, text, diff_text
+                )
+                untracked_text = None
+            regex, replacement, count = regex_cleaners[step]
+            text, step_diff_steps = _sub_with_diff(
+                regex, replacement, text, count
+            )
+            diff_steps = compose_diff_steps(diff_steps, step_diff_steps)
+        else:
+            if untracked_text is None:
+                untracked_text = text
+            text = clean_text(text, [step])
+    if untracked_text is not None:
+        diff_steps = _diff_untracked(
+            diff_steps, untracked_text, text, diff_text
+        )
+    return text, diff_steps
+
+
+def _diff_untracked(
+    diff_steps: DiffSteps,
+    text_before: str,
+    text_after: str,
+    diff_text: str | None,
+) -> DiffSteps:
+    """Add the diff from text_before to text_after to diff_steps."""
+    if diff_text is not None and diff_steps == [("=", len(diff_text))]:
+        # nothing has changed yet, so diff from diff_text instead
+        text_before = diff_text
+    return compose_diff_steps(
+        diff_steps, list(SpanUpdater.get_diff_steps(text_before, text_after))
+    )
@@ -0,0 +1,219 @@
+from array import array
+from collections.abc import Hashable, Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+from eyecite.models import CitationBase, ResourceCitation
+
+# value of integer columns, and of the codes of string columns, where a
+# citation has no value
+NULL = -1
+
+# integer columns, with their array typecodes
+INTEGER_COLUMNS = {
+    "document": "i",
+    "span_start": "q",
+    "span_end": "q",
+    "full_span_start": "q",
+    "full_span_end": "q",
+    "year": "i",
+}
+
+# dictionary-encoded string columns
+STRING_COLUMNS = ("type", "volume", "reporter", "page", "court", "pin_cite")
+
+COLUMNS = (
+    "document",
+    "type",
+    "span_start",
+    "span_end",
+    "full_span_start",
+    "full_span_end",
+    "volume",
+    "reporter",
+    "page",
+    "year",
+    "court",
+    "pin_cite",
+)
+
+
+@dataclass
+class CitationColumns:
+    """Citation data stored as one array per column, for analytics over
+    many citations.
+
+    Integer columns are `array.array`s. String columns are dictionary
+    encoded: `columns[name]` holds a code per citation, indexing into
+    `dictionaries[name]`. Missing values are stored as `NULL` in both. The
+    arrays support the buffer protocol, so `to_numpy` and `to_arrow` wrap
+    them without copying.
+
+    Columns:
+        document: The position of the citation's document in `document_ids`.
+        type: The citation's class name, such as "FullCaseCitation".
+        span_start, span_end: The citation's `span()`.
+        full_span_start, full_span_end: The citation's `full_span()`.
+        volume: The volume, as found in the text.
+        reporter: The corrected reporter, as in `corpus.citation_key`.
+        page: The corrected page.
+        year: The year, for citations with a year in a valid range, or a
+            numeric year string.
+        court: The court id from `metadata.court`.
+        pin_cite: The pin cite from `metadata.pin_cite`.
+    """
+
+    document_ids: list[Hashable] = field(default_factory=list)
+    columns: "dict[str, array[int]]" = field(
+        default_factory=lambda: {
+            name: array(INTEGER_COLUMNS.get(name, "i")) for name in COLUMNS
+        }
+    )
+    dictionaries: dict[str, list[str]] = field(
+        default_factory=lambda: {name: [] for name in STRING_COLUMNS}
+    )
+
+    def __len__(self) -> int:
+        return len(self.columns["document"])
+
+    def to_pydict(self) -> dict[str, list]:
+        """Return the columns as lists, with strings decoded and missing
+        values as None."""
+        result: dict[str, list] = {}
+        for name, column in self.columns.items():
+            if name in self.dictionaries:
+                values = self.dictionaries[name]
+                result[name] = [
+                    None if code == NULL else values[code] for code in column
+                ]
+            else:
+                result[name] = [
+                    None if value == NULL else value for value in column
+                ]
+        result["document"] = [self.document_ids[i] for i in result["document"]]
+        return result
+
+    def to_numpy(self) -> dict[str, Any]:
+        """Return the columns as numpy arrays sharing memory with this
+        object. String columns are returned as their codes, which index into
+        `dictionaries`, and missing values are `NULL`. Requires numpy."""
+        # pylint: disable=import-outside-toplevel
+        import numpy
+
+        return {
+            name: numpy.frombuffer(column, dtype=f"=i{column.itemsize}")
+            for name, column in self.columns.items()
+        }
+
+    def to_arrow(self) -> Any:
+        """Return the columns as a `pyarrow.Table`, with missing values as
+        nulls and string columns as dictionary arrays. The arrays' data
+        buffers share memory with this object. Requires pyarrow."""
+        # pylint: disable=import-outside-toplevel
+        import pyarrow
+        import pyarrow.compute
+
+        arrays = {}
+        for name, column in self.columns.items():
+            data_type = pyarrow.int64()
+            if column.itemsize == 4:
+                data_type = pyarrow.int32()
+            values = pyarrow.Array.from_buffers(
+                data_type, len(column), [None, pyarrow.py_buffer(column)]
+            )
+            if name != "document":
+                # mark NULLs as missing with a validity bitmap
+                valid = pyarrow.compute.not_equal(values, NULL)
+                values = pyarrow.Array.from_buffers(
+                    data_type,
+                    len(column),
+                    [valid.buffers()[1], pyarrow.py_buffer(column)],
+                )
+            if name in self.dictionaries:
+                values = pyarrow.DictionaryArray.from_arrays(
+                    values,
+                    pyarrow.array(self.dictionaries[name], pyarrow.string()),
+                )
+            arrays[name] = values
+        return pyarrow.table(arrays)
+
+
+def citations_to_columns(
+    citations: Iterable[CitationBase],
+) -> CitationColumns:
+    """Convert the citations found in a single document to columns.
+
+    Args:
+        citations: Citations returned by `eyecite.find.get_citations`.
+
+    Returns:
+        A `CitationColumns`, with a `document` of 0 for every citation.
+    """
+    return documents_to_columns([(None, citations)])
+
+
+def documents_to_columns(
+    batch: Iterable[tuple[Hashable, Iterable[CitationBase]]],
+) -> CitationColumns:
+    """Convert the citations of many documents to columns.
+
+    Args:
+        batch: An iterable of (document id, citations) pairs, where the
+            citations are returned from calling `eyecite.find.get_citations`
+            on the document.
+
+    Returns:
+        A `CitationColumns` holding the citations of every document in
+            order. Each citation's `document` column is the position of its
+            document in `batch`, and the ids are kept in `document_ids`.
+    """
+    result = CitationColumns()
+    columns = result.columns
+    # appenders of the column arrays, and codes of string values, by name
+    appenders = {name: column.append for name, column in columns.items()}
+    codes: dict[str, dict[str, int]] = {name: {} for name in STRING_COLUMNS}
+
+    def encode(name: str, value: str | None) -> None:
+        if value is None:
+            appenders[name](NULL)
+        else:
+            lookup = codes[name]
+            appenders[name](lookup.setdefault(value, len(lookup)))
+
+    for position, (document_id, citations) in enumerate(batch):
+        result.document_ids.append(document_id)
+        for citation in citations:
+            groups = citation.groups
+            metadata = citation.metadata
+            start, end = citation.span()
+            full_start, full_end = citation.full_span()
+            reporter = groups.get("reporter")
+            page = groups.get("page")
+            year = None
+            if isinstance(citation, ResourceCitation):
+                reporter = reporter and citation.corrected_reporter()
+                page = page and citation.corrected_page()
+                year = citation.year
+
+            appenders["document"](position)
+            encode("type", type(citation).__name__)
+            appenders["span_start"](start)
+            appenders["span_end"](end)
+            appenders["full_span_start"](full_start)
+            appenders["full_span_end"](full_end)
+            encode("volume", groups.get("volume"))
+            encode("reporter", reporter)
+            encode("page", page)
+            if isinstance(year, str):
+                # some extended citations store the year as found in the text
+                numeric = year.isdecimal() and len(year) <= 4
+                year = int(year) if numeric else None
+            elif not isinstance(year, int):
+                year = None
+            appenders["year"](NULL if year is None else year)
+            encode("court", getattr(metadata, "court", None))
+            encode("pin_cite", getattr(metadata, "pin_cite", None))
+
+    for name, lookup in codes.items():
+        result.dictionaries[name] = list(lookup)
+    return result
@@ -0,0 +1,176 @@
+import os
+import sqlite3
+import threading
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+from eyecite.models import CitationBase, FullCitation, ResourceType
+from eyecite.resolve import resolve_full_citation
+
+# normalized (volume, reporter, page) of a citation
+CitationKey = tuple[str, str, str]
+
+# SQLite limits the number of variables in a single statement (to 999 in
+# older versions), so batch lookups are split into chunks of this many keys
+LOOKUP_CHUNK_SIZE = 300
+
+
+@dataclass(frozen=True)
+class CorpusResource(ResourceType):
+    """Resource identified by its id in a `CorpusIndex`. Citations resolve to
+    equal resources whenever the index maps them to the same id, so parallel
+    citations to one opinion are grouped together."""
+
+    resource_id: Any
+
+    def __hash__(self):
+        return hash((type(self).__name__, self.resource_id))
+
+
+def citation_key(citation: CitationBase) -> CitationKey | None:
+    """Return the normalized (volume, reporter, page) under which a full
+    citation is stored in a `CorpusIndex`, using its corrected reporter and
+    page. Returns None for citations missing any of the three."""
+    if not isinstance(citation, FullCitation):
+        return None
+    volume = citation.groups.get("volume")
+    reporter = (
+        citation.groups.get("reporter") and citation.corrected_reporter()
+    )
+    page = citation.groups.get("page") and citation.corrected_page()
+    if not (volume and reporter and page):
+        return None
+    return volume, reporter, page
+
+
+class CorpusIndex:
+    """Persistent index from normalized citations to stable resource ids,
+    stored in a single SQLite database file. Use it to resolve citations
+    across documents:
+
+    >>> index = CorpusIndex("corpus.sqlite")
+    >>> index.bulk_load([("1", "U.S.", "1", 101), ("2", "S. Ct.", "3", 101)])
+    >>> resolve_citations(
+    ...     citations, resolve_full_citation=index.resolver(citations)
+    ... )
+
+    Reporters should be stored as eyecite's corrected reporter names (see
+    `citation_key`), such as "U.S." or "F.2d". Resource ids may be any value
+    that SQLite can store, such as ints or strings.
+    """
+
+    def __init__(self, path: str | os.PathLike):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            # resource_id has no declared type, so ints and strings are
+            # returned as they were stored
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS citations ("
+                "volume TEXT NOT NULL, reporter TEXT NOT NULL, "
+                "page TEXT NOT NULL, resource_id NOT NULL, "
+                "PRIMARY KEY (volume, reporter, page)"
+                ") WITHOUT ROWID"
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._connection.execute(
+                "SELECT COUNT(*) FROM citations"
+            ).fetchone()
+        return int(count)
+
+    def bulk_load(self, rows: Iterable[tuple[str, str, str, Any]]) -> None:
+        """Store (volume, reporter, page, resource_id) rows in a single
+        transaction, replacing any existing rows for the same citations."""
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO citations "
+                "(volume, reporter, page, resource_id) VALUES (?, ?, ?, ?)",
+                (
+                    (str(volume), reporter, str(page), resource_id)
+                    for volume, reporter, page, resource_id in rows
+                ),
+            )
+
+    def add_citations(
+        self, citations: Iterable[tuple[CitationBase, Any]]
+    ) -> None:
+        """Store (citation, resource_id) pairs, such as the citations found
+        in an opinion's own header. Citations without a key are skipped."""
+        self.bulk_load(
+            (*key, resource_id)
+            for citation, resource_id in citations
+            if (key := citation_key(citation))
+        )
+
+    def lookup_many(
+        self, keys: Iterable[CitationKey]
+    ) -> dict[CitationKey, Any]:
+        """Return a dict mapping each of the given keys that is in the index
+        to its resource id, fetched in as few queries as possible."""
+        unique_keys = list(dict.fromkeys(keys))
+        found: dict[CitationKey, Any] = {}
+        with self._lock:
+            for i in range(0, len(unique_keys), LOOKUP_CHUNK_SIZE):
+                chunk = unique_keys[i : i + LOOKUP_CHUNK_SIZE]
+                values = ", ".join(["(?, ?, ?)"] * len(chunk))
+                rows = self._connection.execute(
+                    "WITH keys (volume, reporter, page) AS "
+                    f"(VALUES {values}) "
+                    "SELECT volume, reporter, page, resource_id "
+                    "FROM keys JOIN citations USING (volume, reporter, page)",
+                    [part for key in chunk for part in key],
+                ).fetchall()
+                for volume, reporter, page, resource_id in rows:
+                    found[volume, reporter, page] = resource_id
+        return found
+
+    def lookup(self, citation: CitationBase) -> Any | None:
+        """Return the resource id of a single citation, or None."""
+        key = citation_key(citation)
+        return self.lookup_many([key]).get(key) if key else None
+
+    def resolver(
+        self,
+        citations: Iterable[CitationBase],
+        fallback: Callable[
+            [FullCitation], ResourceType
+        ] = resolve_full_citation,
+    ) -> Callable[[FullCitation], ResourceType]:
+        """Return a `resolve_full_citation` hook for
+        `eyecite.resolve.resolve_citations`. The ids of all the given
+        citations are fetched up front in one batch; indexed citations
+        resolve to a `CorpusResource`, and the rest are passed to fallback.
+
+        Args:
+            citations: The citations that will be resolved, usually those
+                returned by `eyecite.find.get_citations` for one document.
+            fallback: Resolver for citations that aren't in the index.
+
+        Returns:
+            A function resolving a full citation to a resource.
+        """
+        keys = {
+            key for citation in citations if (key := citation_key(citation))
+        }
+        resource_ids = self.lookup_many(keys)
+
+        def resolve(full_citation: FullCitation) -> ResourceType:
+            key = citation_key(full_citation)
+            if key in resource_ids:
+                return CorpusResource(resource_ids[key])
+            if key and key not in keys:
+                # not prefetched, so look it up on its own
+                resource_id = self.lookup_many([key]).get(key)
+                if resource_id is not None:
+                    return CorpusResource(resource_id)
+            return fallback(full_citation)
+
+        return resolve
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        self._connection.close()
@@ -1,8 +1,18 @@
+import logging
 import re
+import time
 from bisect import bisect_left, bisect_right
+from collections import Counter
 from collections.abc import Callable, Iterable
 from typing import cast
 
+from eyecite.cache import (
+    CacheBackend,
+    cache_key,
+    dump_citations,
+    load_citations,
+)
+from eyecite.clean import clean_text
 from eyecite.helpers import (
     disambiguate_reporters,
     extract_pin_cite,
@@ -29,6 +39,7 @@ from eyecite.models import (
     ShortCaseCitation,
     SupraCitation,
     SupraToken,
+    TokenIndex,
     Tokens,
     UnknownCitation,
 )
@@ -36,6 +47,8 @@ from eyecite.regexes import SUPRA_ANTECEDENT_REGEX, reference_pin_cite_re
 from eyecite.tokenizers import Tokenizer, default_tokenizer
 from eyecite.utils import is_valid_name
 
+logger = logging.getLogger(__name__)
+
 
 def get_citations(
     plain_text: str = "",
@@ -43,6 +56,11 @@ def get_citations(
     tokenizer: Tokenizer = default_tokenizer,
     markup_text: str = "",
     clean_steps: Iterable[str | Callable[[str], str]] | None = None,
+    cache: CacheBackend | None = None,
+    deadline: float | None = None,
+    max_chars: int | None = None,
+    detach: bool = False,
+    on_truncated: Callable[[list[CitationBase]], None] | None = None,
 ) -> list[CitationBase]:
     """This is eyecite's main workhorse function. Given a string of text
     (e.g., a judicial opinion or other legal doc), return a list of
@@ -62,6 +80,37 @@ def get_citations(
             it to extract ReferenceCitations that may be detectable via
             markup style tags
         clean_steps: Cleanup steps and methods
+        cache: An optional `eyecite.cache.CacheBackend`. Results are stored
+            under a hash of the arguments and the installed eyecite,
+            reporters-db and courts-db versions, so repeated calls with the
+            same text skip tokenization and extraction. Calls whose
+            clean_steps include a callable other than a module-level
+            function, such as a lambda or partial, aren't cached, and
+            neither are calls with a deadline or max_chars, so that
+            truncation is reported the same way with and without a cache.
+        deadline: An optional `time.monotonic()` value. Once it has passed,
+            extraction stops between extractors and between citations, and
+            the citations found so far are returned. The deadline isn't
+            checked while a single extractor's regex runs, so it bounds the
+            number of extractors run rather than the time taken by any one
+            of them.
+        max_chars: An optional limit on how much of the cleaned text is
+            searched for citations.
+        detach: Whether to drop each citation's reference to the `Document`
+            once its metadata has been extracted, so that keeping citations
+            around doesn't keep the document's texts, tokens and offset maps
+            alive. Detached citations still answer `matched_text()`,
+            `span()` and `corrected_citation_full()`, but can't be passed to
+            `eyecite.annotate.annotate_document`, and don't carry
+            `document.truncated`; use on_truncated to detect truncation.
+        on_truncated: An optional callback, called with the returned
+            citations if deadline or max_chars stopped extraction early.
+            Unlike `document.truncated`, this also reports truncated results
+            that are empty or detached.
+
+    If deadline or max_chars stops extraction early, the citations'
+    `document.truncated` is set, on_truncated is called, and a warning is
+    logged.
 
     Returns:
         A list of `eyecite.models.CitationBase` objects
@@ -69,14 +118,40 @@ def get_citations(
     if plain_text == "eyecite":
         return joke_cite
 
+    key = None
+    if deadline is not None or max_chars is not None:
+        # a limited call may be truncated where a cached result wasn't
+        cache = None
+    if cache is not None:
+        if clean_steps is not None:
+            # the steps are read twice, for the key and for cleaning
+            clean_steps = list(clean_steps)
+        # None if the clean steps include a lambda, closure or partial
+        key = cache_key(
+            plain_text, markup_text, remove_ambiguous, tokenizer, clean_steps
+        )
+    if cache is not None and key is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            cached_citations = load_citations(cached)
+            if cached_citations is not None:
+                if detach:
+                    _detach_citations(cached_citations)
+                return cached_citations
+
     document = Document(
         plain_text=plain_text,
         markup_text=markup_text,
         clean_steps=clean_steps,
     )
-    document.tokenize(tokenizer=tokenizer)
+    document.tokenize(
+        tokenizer=tokenizer, deadline=deadline, max_chars=max_chars
+    )
     citations: list[CitationBase] = []
     for i, token in document.citation_tokens:
+        if deadline is not None and time.monotonic() > deadline:
+            document.truncated = True
+            break
         citation: CitationBase
         token_type = type(token)
 
@@ -108,14 +183,18 @@ def get_citations(
         # immediately prior, but for safety we will leave that resolution up
         # to the user.
         elif token_type is IdToken:
-            citation = _extract_id_citation(document.words, i)
+            citation = _extract_id_citation(
+                document.words, i, document.token_index
+            )
 
         # CASE 3: Token is a "supra" reference.
         # In this case, we're not sure yet what the citation's antecedent is.
         # It could be any of the previous citations above. Thus, like an Id.
         # citation, for safety we won't resolve this reference yet.
         elif token_type is SupraToken:
-            citation = _extract_supra_citation(document.words, i)
+            citation = _extract_supra_citation(
+                document.words, i, document.token_index
+            )
 
         # CASE 4: Token is a section marker.
         # In this case, it's likely that this is a reference to a citation,
@@ -146,9 +225,74 @@ def get_citations(
     # the doc. The ordering of this list is important for reconstructing
     # the references of the ShortCaseCitation, SupraCitation, and
     # IdCitation and ReferenceCitation objects.
+    if document.truncated:
+        logger.warning(
+            "Citation extraction was truncated after %d citations",
+            len(citations),
+        )
+        if on_truncated is not None:
+            on_truncated(citations)
+    elif cache is not None and key is not None:
+        cache.set(key, dump_citations(citations, document))
+    if detach:
+        # after on_truncated, which replaces document.truncated once detached
+        _detach_citations(citations)
     return citations
 
 
+def _detach_citations(citations: list[CitationBase]) -> None:
+    """Drop the citations' references to their Document."""
+    for citation in citations:
+        citation.document = None
+
+
+def count_citations(
+    plain_text: str,
+    tokenizer: Tokenizer = default_tokenizer,
+    clean_steps: Iterable[str | Callable[[str], str]] | None = None,
+) -> Counter[tuple[str | None, str]]:
+    """Count the citations to each reporter edition in a string of text.
+
+    This is a lightweight alternative to `get_citations` for corpus
+    analytics. It only runs the tokenizer, and skips building citation
+    objects, extracting metadata, and filtering. Both full and short form
+    citations are counted.
+
+    Example:
+    >>> count_citations("1 U.S. 1; 2 U.S. 2; 3 F.2d 3")
+    Counter({('U.S.', 'U.S.'): 2, ('F.', 'F.2d'): 1})
+
+    Args:
+        plain_text: The text to parse.
+        tokenizer: An instance of a Tokenizer object. Uses the
+            `eyecite.tokenizers.AhocorasickTokenizer` by default.
+        clean_steps: Cleanup steps to apply to the text before counting.
+
+    Returns:
+        A `collections.Counter` keyed by (reporter, edition) tuples. The
+        reporter is the short name of the top-level reporter, or None if
+        the citation matched editions from different reporters. The edition
+        is the short name of the edition if only one edition matched,
+        otherwise the reporter string as found in the text.
+    """
+    if clean_steps:
+        plain_text = clean_text(plain_text, clean_steps)
+
+    counts: Counter[tuple[str | None, str]] = Counter()
+    for token in tokenizer.tokenize_citations(plain_text):
+        if type(token) is not CitationToken:
+            continue
+        editions = token.exact_editions or token.variation_editions
+        reporters = {e.reporter.short_name for e in editions}
+        reporter = reporters.pop() if len(reporters) == 1 else None
+        if len({e.short_name for e in editions}) == 1:
+            edition = editions[0].short_name
+        else:
+            edition = token.groups["reporter"]
+        counts[(reporter, edition)] += 1
+    return counts
+
+
 def extract_reference_citations(
     citation: ResourceCitation, document: Document
 ) -> list[ReferenceCitation]:
@@ -277,7 +421,10 @@ def _extract_shortform_citation(
 
     cite_token = cast(CitationToken, document.words[index])
     pin_cite, span_end, parenthetical = extract_pin_cite(
-        document.words, index, prefix=cite_token.groups["page"]
+        document.words,
+        index,
+        prefix=cite_token.groups["page"],
+        token_index=document.token_index,
     )
     span_end = span_end if span_end else 0
     citation = ShortCaseCitation(
@@ -309,6 +456,7 @@ def _extract_shortform_citation(
 def _extract_supra_citation(
     words: Tokens,
     index: int,
+    token_index: TokenIndex | None = None,
 ) -> SupraCitation:
     """Given a list of words and the index of a supra token, look before
     and after to see if this is a supra citation. If found, construct
@@ -319,7 +467,9 @@ def _extract_supra_citation(
     Supra 3: Adarand, supra, somethingelse
     Supra 4: Adrand, supra. somethingelse
     """
-    pin_cite, span_end, parenthetical = extract_pin_cite(words, index)
+    pin_cite, span_end, parenthetical = extract_pin_cite(
+        words, index, token_index=token_index
+    )
     antecedent_guess = None
     volume = None
     m = match_on_tokens(
@@ -328,6 +478,7 @@ def _extract_supra_citation(
         SUPRA_ANTECEDENT_REGEX,
         strings_only=True,
         forward=False,
+        token_index=token_index,
     )
     if m:
         antecedent_guess = m["antecedent"]
@@ -356,12 +507,15 @@ def _extract_supra_citation(
 def _extract_id_citation(
     words: Tokens,
     index: int,
+    token_index: TokenIndex | None = None,
 ) -> IdCitation:
     """Given a list of words and the index of an id token, gather the
     immediately succeeding tokens to construct and return an IdCitation
     object.
     """
-    pin_cite, span_end, parenthetical = extract_pin_cite(words, index)
+    pin_cite, span_end, parenthetical = extract_pin_cite(
+        words, index, token_index=token_index
+    )
     return IdCitation(
         cast(IdToken, words[index]),
         index,
@@ -434,25 +588,37 @@ def find_reference_citations_from_markup(
         start_in_markup = document.plain_to_markup.update(
             citation.span()[0], bisect_right
         )
-        for match in re.finditer(
-            regex, document.markup_text[start_in_markup:]
-        ):
-            full_start_in_plain = document.markup_to_plain.update(
-                start_in_markup + match.start(), bisect_left
-            )
-            full_end_in_plain = document.markup_to_plain.update(
-                start_in_markup + match.end(), bisect_right
-            )
+        matches = list(
+            re.finditer(regex, document.markup_text[start_in_markup:])
+        )
+        if not matches:
+            continue
 
-            # the first group [match.group(0)] is the whole match,
-            # with whitespace and punctuation. the second group, match.group(1)
-            # is the only capturing and named group
-            start_in_plain = document.markup_to_plain.update(
-                start_in_markup + match.start(1), bisect_left
-            )
-            end_in_plain = document.markup_to_plain.update(
-                start_in_markup + match.end(1), bisect_right
-            )
+        # the first group [match.group(0)] is the whole match,
+        # with whitespace and punctuation. the second group, match.group(1)
+        # is the only capturing and named group. Translate the offsets of
+        # all matches at once.
+        starts_in_plain = document.markup_to_plain.update_many(
+            [
+                start_in_markup + offset
+                for match in matches
+                for offset in (match.start(), match.start(1))
+            ],
+            bisect_left,
+        )
+        ends_in_plain = document.markup_to_plain.update_many(
+            [
+                start_in_markup + offset
+                for match in matches
+                for offset in (match.end(), match.end(1))
+            ],
+            bisect_right,
+        )
+        for i, match in enumerate(matches):
+            full_start_in_plain, start_in_plain = starts_in_plain[
+                2 * i : 2 * i + 2
+            ]
+            full_end_in_plain, end_in_plain = ends_in_plain[2 * i : 2 * i + 2]
             raw_after = document.plain_text[full_end_in_plain:]
             if re.match(r"^\s*(v[.s]|supra)\s", raw_after):
                 # filter likely bad reference matches
@@ -1,6 +1,8 @@
 import logging
-from bisect import bisect_right
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
 from datetime import date
+from functools import cache, lru_cache
 from string import whitespace
 from typing import Any, cast
 
@@ -24,6 +26,7 @@ from eyecite.models import (
     SupraCitation,
     SupraToken,
     Token,
+    TokenIndex,
     Tokens,
 )
 from eyecite.regexes import (
@@ -46,6 +49,23 @@ BACKWARD_SEEK = 28  # Median case name length in the CL db is 28 (2016-02-26)
 MAX_MATCH_CHARS = 300
 
 
+@cache
+def _court_paren_index() -> tuple[dict[str, str], dict[str, Any]]:
+    """Build the lookups used by get_court_by_paren: normalized citation
+    strings to court ids for exact matches, and every prefix of those
+    strings to court ids for startswith matches. Where courts collide, the
+    exact lookup keeps the first court and the prefix lookup the last, as
+    a scan over all courts in order would."""
+    exact: dict[str, str] = {}
+    prefixes: dict[str, Any] = {}
+    for court in courts:
+        s = re.sub(r"[^\w]", "", court["citation_string"]).lower()
+        exact.setdefault(s, str(court["id"]))
+        for i in range(1, len(s) + 1):
+            prefixes[s[:i]] = court["id"]
+    return exact, prefixes
+
+
 def get_court_by_paren(paren_string: str) -> str | None:
     """Takes the citation string, usually something like "2d Cir", and maps
     that back to the court code.
@@ -57,23 +77,15 @@ def get_court_by_paren(paren_string: str) -> str | None:
     # Remove whitespace and punctuation because citation strings sometimes lack
     # internal spaces, e.g. "Pa.Super." or "SC" (South Carolina)
     court_str = re.sub(r"[^\w]", "", paren_string).lower()
+    if not court_str:
+        return None
 
-    court_code = None
-    if court_str:
-        for court in courts:
-            s = re.sub(r"[^\w]", "", court["citation_string"]).lower()
-
-            # Check for an exact match first
-            if s == court_str:
-                return str(court["id"])
-
-            # If no exact match, try to record a startswith match for possible
-            # eventual return
-            if s.startswith(court_str):
-                court_code = court["id"]
-
-        return court_code
-
+    # Check for an exact match first, falling back to the last court whose
+    # citation string starts with court_str
+    exact, prefixes = _court_paren_index()
+    court_code = exact.get(court_str)
+    if court_code is None:
+        court_code = prefixes.get(court_str)
     return court_code
 
 
@@ -95,7 +107,11 @@ def get_year(word: str) -> int | None:
     return year
 
 
-def add_post_citation(citation: CaseCitation, words: Tokens) -> None:
+def add_post_citation(
+    citation: CaseCitation,
+    words: Tokens,
+    token_index: TokenIndex | None = None,
+) -> None:
     """Add to a citation object any additional information found after the base
     citation, including court, year, and possibly page range.
 
@@ -105,6 +121,7 @@ def add_post_citation(citation: CaseCitation, words: Tokens) -> None:
         words,
         citation.index + 1,
         POST_FULL_CITATION_REGEX,
+        token_index=token_index,
     )
     if not m:
         return
@@ -178,6 +195,121 @@ def _initialize_search_state(citation: CaseCitation) -> dict[str, Any]:
     }
 
 
+# Bit flags describing a word for _scan_for_case_boundaries. _WORD_SEEN
+# marks flags that have been computed.
+_WORD_SEEN = 1
+_WORD_COMMA = 1 << 1
+_WORD_BLANK = 1 << 2
+_WORD_CITATION = 1 << 3
+_WORD_TERMINAL = 1 << 4
+_WORD_PAREN_YEAR = 1 << 5
+_WORD_OPEN_PAREN = 1 << 6
+# a "(" that isn't part of the case name, e.g. "(" or "(see"
+_WORD_SKIP_PAREN = 1 << 7
+_WORD_UPPER = 1 << 8
+_WORD_ALPHA = 1 << 9
+# "of", "the", "an" and "and", allowed in lowercase in case names
+_WORD_ARTICLE = 1 << 10
+_WORD_PLACEHOLDER = 1 << 11
+_WORD_V = 1 << 12
+_WORD_STOP_WORD = 1 << 13
+# likely an abbreviation or end of sentence, like "Corp." or "Court."
+_WORD_ABBREVIATION = 1 << 14
+_WORD_EX_REL = 1 << 15
+_WORD_SUPRA = 1 << 16
+
+_TERMINAL_PUNCTUATION_REGEX = re.compile(r"[;”\"]")
+_PAREN_YEAR_REGEX = re.compile(r"\(\d{4}\)")
+
+
+def _get_word_flags(word: Any) -> int:
+    """Compute the _WORD_* flags for a word."""
+    word_str = str(word)
+    flags = _WORD_SEEN
+    if word == ",":
+        flags |= _WORD_COMMA
+    if not word_str.strip():
+        flags |= _WORD_BLANK
+    if isinstance(word, CitationToken):
+        flags |= _WORD_CITATION
+    elif isinstance(word, PlaceholderCitationToken):
+        flags |= _WORD_PLACEHOLDER
+    if word_str.endswith((";", "”", '"')):
+        flags |= _WORD_TERMINAL
+    if _PAREN_YEAR_REGEX.match(word_str):
+        flags |= _WORD_PAREN_YEAR
+    if word_str.startswith("("):
+        flags |= _WORD_OPEN_PAREN
+        if word_str == "(" or word_str[1].isalpha() and word_str[1].islower():
+            flags |= _WORD_SKIP_PAREN
+    if word_str[:1].isupper():
+        flags |= _WORD_UPPER
+    if word_str[:1].isalpha():
+        flags |= _WORD_ALPHA
+    if word_str in ["of", "the", "an", "and"]:
+        flags |= _WORD_ARTICLE
+    if _is_v_token(word):
+        flags |= _WORD_V
+    if isinstance(word, StopWordToken):
+        flags |= _WORD_STOP_WORD
+    if len(word_str) > 4 and word_str.endswith("."):
+        flags |= _WORD_ABBREVIATION
+    if word_str in ["ex", "rel."]:
+        flags |= _WORD_EX_REL
+    if isinstance(word, SupraToken):
+        flags |= _WORD_SUPRA
+    return flags
+
+
+@dataclass(eq=False, repr=False)
+class _CaseNameIndex:
+    """Per-document index for _scan_for_case_boundaries, so that words near
+    several citations are only inspected once. Word flags are computed on
+    first use; words ending in terminal punctuation, where the backward scan
+    always stops, are found up front with one regex pass over the text."""
+
+    words: Tokens
+    token_index: TokenIndex
+    terminal_indexes: list[int] = field(init=False)
+    flags: list[int] = field(init=False)
+
+    def __post_init__(self):
+        words = self.words
+        starts = self.token_index.starts
+        self.terminal_indexes = []
+        for m in _TERMINAL_PUNCTUATION_REGEX.finditer(self.token_index.text):
+            # find the word ending with this character, if any
+            i = bisect_left(starts, m.end())
+            if starts[i] == m.end() and not isinstance(
+                words[i - 1], CitationToken
+            ):
+                self.terminal_indexes.append(i - 1)
+        self.flags = [0] * len(words)
+
+    def get_flags(self, index: int) -> int:
+        """Return the _WORD_* flags for words[index]."""
+        flags = self.flags[index]
+        if not flags:
+            flags = self.flags[index] = _get_word_flags(self.words[index])
+        return flags
+
+    def scan_stop(self, index: int) -> int:
+        """Return the index of the last word before index that ends in
+        terminal punctuation, or -1."""
+        i = bisect_left(self.terminal_indexes, index) - 1
+        return self.terminal_indexes[i] if i >= 0 else -1
+
+
+def _get_case_name_index(document: Document) -> _CaseNameIndex:
+    """Return the document's _CaseNameIndex, building it on first use."""
+    index: _CaseNameIndex | None = document._case_name_index
+    if index is None or index.words is not document.words:
+        index = document._case_name_index = _CaseNameIndex(
+            document.words, document.token_index
+        )
+    return index
+
+
 def _scan_for_case_boundaries(
     document: Document, citation: CaseCitation, state: dict[str, Any]
 ) -> dict[str, Any]:
@@ -191,66 +323,76 @@ def _scan_for_case_boundaries(
     Returns: search state to process the information
     """
     words = document.words
-    back_seek = citation.index - BACKWARD_SEEK
+    token_index = document.token_index
+    case_name_index = _get_case_name_index(document)
+    starts = token_index.starts
+    # The scan always stops at terminal punctuation, so it can't go further
+    # back than the last word that ends with it
+    back_seek = max(
+        citation.index - BACKWARD_SEEK,
+        case_name_index.scan_stop(citation.index) - 1,
+    )
 
     for index in range(citation.index - 1, max(back_seek, -1), -1):
-        word = words[index]
-        word_str = str(word)
-        state["offset"] += len(word)
+        flags = case_name_index.get_flags(index)
+        state["offset"] += starts[index + 1] - starts[index]
 
         # Skip commas
-        if word == ",":
+        if flags & _WORD_COMMA:
             continue
 
         state["case_name_length"] += 1
 
         # Track plaintiff name length if we've already found a "v" token
-        if state["v_token"] is not None and word_str.strip() != "":
+        if state["v_token"] is not None and not flags & _WORD_BLANK:
             state["plaintiff_length"] += 1
 
         # Handle citation tokens - just adjust the title boundary
-        if isinstance(word, CitationToken):
+        if flags & _WORD_CITATION:
             state["title_starting_index"] = index - 1
             continue
 
         # Break on terminal punctuation
-        if (
-            word_str.endswith(";")
-            or word_str.endswith("”")
-            or word_str.endswith('"')
-        ):
+        if flags & _WORD_TERMINAL:
             state["start_index"] = index + 2
             state["candidate_case_name"] = _extract_text(
-                words, state["start_index"], state["title_starting_index"]
+                words,
+                state["start_index"],
+                state["title_starting_index"],
+                token_index,
             )
             break
 
         # Handle year before citation
-        if re.match(r"\(\d{4}\)", word_str):
+        if flags & _WORD_PAREN_YEAR:
             state["title_starting_index"] = index - 1
-            state["pre_cite_year"] = word_str[1:5]
+            state["pre_cite_year"] = str(words[index])[1:5]
             continue
 
         # Break on opening parenthesis after first word
-        if word_str.startswith("(") and state["case_name_length"] > 3:
+        if flags & _WORD_OPEN_PAREN and state["case_name_length"] > 3:
             state["start_index"] = index
-            if (
-                word_str == "("
-                or word_str[1].isalpha()
-                and word_str[1].islower()
-            ):
+            if flags & _WORD_SKIP_PAREN:
                 state["start_index"] = index + 2
 
             state["candidate_case_name"] = _extract_text(
-                words, state["start_index"], state["title_starting_index"]
+                words,
+                state["start_index"],
+                state["title_starting_index"],
+                token_index,
             )
             break
 
         # Break on lowercase word after "v" token
-        if _is_lowercase_after_v_token(word_str, state["v_token"]):
+        if state["v_token"] is not None and not flags & (
+            _WORD_UPPER | _WORD_BLANK | _WORD_ARTICLE
+        ):
             state["start_index"] = index + 2
             state["candidate_case_name"] = _extract_text(
-                words, state["start_index"], state["title_starting_index"]
+                words,
+                state["start_index"],
+                state["title_starting_index"],
+                token_index,
             )
             state["candidate_case_name"] = re.sub(
                 r"^(of|the|an|and)\s+", "", state["candidate_case_name"]
@@ -258,42 +400,58 @@ def _scan_for_case_boundaries(
             break
 
         # Skip placeholder citations
-        if isinstance(word, CitationToken | PlaceholderCitationToken):
+        if flags & _WORD_PLACEHOLDER:
             state["title_starting_index"] = index - 1
             continue
 
         # Handle "v" token - store it but don't break yet
-        if _is_v_token(word):
-            state["v_token"] = word
+        if flags & _WORD_V:
+            state["v_token"] = words[index]
             state["start_index"] = index - 2
             state["candidate_case_name"] = _extract_text(
-                words, state["start_index"], state["title_starting_index"]
+                words,
+                state["start_index"],
+                state["title_starting_index"],
+                token_index,
             )
             continue
 
         # Break on likely new sentence after "v" token
-        elif _is_capitalized_abbreviation(
-            word_str, state["v_token"], state["plaintiff_length"]
-        ) or isinstance(word, StopWordToken):
+        elif (
+            state["v_token"] is not None
+            and flags & _WORD_UPPER
+            and flags & _WORD_ABBREVIATION
+            and state["plaintiff_length"] > 1
+        ) or flags & _WORD_STOP_WORD:
             state["start_index"] = index + 2
             state["candidate_case_name"] = _extract_text(
-                words, state["start_index"], state["title_starting_index"]
+                words,
+                state["start_index"],
+                state["title_starting_index"],
+                token_index,
             )
             break
 
         # Break on lowercase word w/o "v" token - start with capitalized words
-        if _is_lowercase_without_v_token(word_str, state["v_token"]):
-            if word_str in ["ex", "rel."]:
+        if (
+            state["v_token"] is None
+            and flags & _WORD_ALPHA
+            and not flags & (_WORD_UPPER | _WORD_BLANK | _WORD_ARTICLE)
+        ):
+            if flags & _WORD_EX_REL:
                 # ignore common lower cased
                 continue
-            if isinstance(word, SupraToken):
+            if flags & _WORD_SUPRA:
                 # supra usually is preceded by a case name so do not
                 # break on supra but also do not capture in title
                 state["title_starting_index"] = index - 1
                 continue
             state["start_index"] = index + 2
             state["candidate_case_name"] = _extract_text(
-                words, state["start_index"], state["title_starting_index"]
+                words,
+                state["start_index"],
+                state["title_starting_index"],
+                token_index,
             )
 
             # Extract just the capitalized word if possible
@@ -311,7 +469,7 @@ def _scan_for_case_boundaries(
         # Handle reaching start of text
         if index == 0:
             state["candidate_case_name"] = _extract_text(
-                words, index, state["title_starting_index"]
+                words, index, state["title_starting_index"], token_index
             )
             state["start_index"] = 0
             state["candidate_case_name"] = re.sub(
@@ -383,9 +541,11 @@ def _process_case_name(
         # Calculate full span start
         offset = (
             len(
-                "".join(
-                    str(w)
-                    for w in words[state["start_index"] : citation.index - 1]
+                _extract_text(
+                    words,
+                    state["start_index"],
+                    citation.index - 1,
+                    document.token_index,
                 )
             )
             + 1
@@ -401,8 +561,18 @@ def _process_case_name(
 # Helper functions to improve readability
 
 
-def _extract_text(words: list[Any], start: int, end: int) -> str:
-    """Extract text from words list between start and end indices."""
+def _extract_text(
+    words: list[Any],
+    start: int,
+    end: int,
+    token_index: TokenIndex | None = None,
+) -> str:
+    """Extract text from words list between start and end indices. If
+    token_index is provided, slice its text instead of joining words."""
+    if token_index is not None and 0 <= start <= end <= len(words):
+        return token_index.text[
+            token_index.starts[start] : token_index.starts[end]
+        ]
     return "".join(str(w) for w in words[start:end])
 
 
@@ -411,75 +581,6 @@ def _is_v_token(word: Any) -> bool:
     return isinstance(word, StopWordToken) and word.groups["stop_word"] == "v"
 
 
-def _is_lowercase_after_v_token(word_str: str, v_token: Any | None) -> bool:
-    """Check if we should break at lowercase word after v token.
-
-    Determines if the current word should cause a break in case name
-    parsing because it's a lowercase word after the versus token.
-
-    Args:
-        word_str: String representation of the current word
-        v_token: The versus token if one has been found
-
-    Returns:
-        True if should break, False otherwise
-    """
-    return (
-        v_token is not None
-        and not word_str[0].isupper()
-        and bool(word_str.strip())
-        and word_str not in ["of", "the", "an", "and"]
-    )
-
-
-def _is_capitalized_abbreviation(
-    word_str: str, v_token: Any | None, plaintiff_length: int
-) -> bool:
-    """Check if we found a likely abbreviation after 'v' token.
-
-    Determines if the current word is likely an abbreviation or end of
-    sentence that should cause a break in parsing.
-
-    Args:
-        word_str: String representation of the current word
-        v_token: The versus token if one has been found
-        plaintiff_length: Number of plaintiff words found so far
-
-    Returns:
-        True if should break, False otherwise
-    """
-    return (
-        v_token is not None
-        and word_str[0].isupper()
-        and len(word_str) > 4
-        and word_str.endswith(".")
-        and plaintiff_length > 1
-    )
-
-
-def _is_lowercase_without_v_token(word_str: str, v_token: Any | None) -> bool:
-    """Check if we should break at lowercase word with no v token.
-
-    Determines if the current word should cause a break in case name
-    parsing because it's a lowercase word and no versus token has been found.
-
-    Args:
-        word_str: String representation of the current word
-        v_token: The versus token if one has been found
-
-    Returns:
-        True if should break, False otherwise
-    """
-
-    return (
-        v_token is None
-        and not word_str[0].isupper()
-        and bool(word_str.strip())
-        and word_str[0].isalpha()
-        and word_str not in ["of", "the", "an", "and"]
-    )
-
-
 def find_html_tags_at_position(
     document: Document, position: int
 ) -> list[tuple[str, int, int]]:
@@ -499,7 +600,7 @@ def find_html_tags_at_position(
         position,
         bisect_right,
     )
-    tags = [r for r in document.emphasis_tags if r[1] <= markup_loc < r[2]]
+    tags = document.emphasis_tag_index.tags_at(markup_loc)
     if len(tags) != 1:
         return []
     return tags
@@ -838,14 +939,22 @@ def convert_html_to_plain_text_and_loc(
     """
     markup_location = results[0]
 
-    start = document.markup_to_plain.update(  # type: ignore
-        markup_location[1],
-        bisect_right,
-    )
-    end = document.markup_to_plain.update(  # type: ignore
-        markup_location[2],
-        bisect_right,
-    )
+    # tags are looked up repeatedly for nearby citations, so cache their
+    # plain text locations
+    plain_spans = document.emphasis_tag_index.plain_spans
+    markup_span = (markup_location[1], markup_location[2])
+    if markup_span not in plain_spans:
+        plain_spans[markup_span] = (
+            document.markup_to_plain.update(  # type: ignore
+                markup_location[1],
+                bisect_right,
+            ),
+            document.markup_to_plain.update(  # type: ignore
+                markup_location[2],
+                bisect_right,
+            ),
+        )
+    start, end = plain_spans[markup_span]
     case_name = document.plain_text[start:end]
     return (case_name, start, end)
 
@@ -864,6 +973,7 @@ def add_pre_citation(citation: FullCaseCitation, document: Document) -> None:
         PRE_FULL_CITATION_REGEX,
         forward=False,
         strings_only=True,
+        token_index=document.token_index,
     )
     if not m:
         return
@@ -881,10 +991,18 @@ def add_pre_citation(citation: FullCaseCitation, document: Document) -> None:
     citation.full_span_start = citation.span()[0] - match_length
 
 
-def add_law_metadata(citation: FullLawCitation, words: Tokens) -> None:
+def add_law_metadata(
+    citation: FullLawCitation,
+    words: Tokens,
+    token_index: TokenIndex | None = None,
+) -> None:
     """Annotate FullLawCitation with pin_cite, publisher, etc."""
     m = match_on_tokens(
-        words, citation.index + 1, POST_LAW_CITATION_REGEX, strings_only=True
+        words,
+        citation.index + 1,
+        POST_LAW_CITATION_REGEX,
+        strings_only=True,
+        token_index=token_index,
     )
     if not m:
         return
@@ -900,13 +1018,18 @@ def add_law_metadata(citation: FullLawCitation, words: Tokens) -> None:
         citation.year = get_year(m["year"])
 
 
-def add_journal_metadata(citation: FullJournalCitation, words: Tokens) -> None:
+def add_journal_metadata(
+    citation: FullJournalCitation,
+    words: Tokens,
+    token_index: TokenIndex | None = None,
+) -> None:
     """Annotate FullJournalCitation with pin_cite, year, etc."""
     m = match_on_tokens(
         words,
         citation.index + 1,
         POST_JOURNAL_CITATION_REGEX,
         strings_only=True,
+        token_index=token_index,
     )
     if not m:
         return
@@ -951,7 +1074,10 @@ def process_parenthetical(
 
 
 def extract_pin_cite(
-    words: Tokens, index: int, prefix: str = ""
+    words: Tokens,
+    index: int,
+    prefix: str = "",
+    token_index: TokenIndex | None = None,
 ) -> tuple[str | None, int | None, str | None]:
     """Test whether text following token at index is a valid pin cite.
     Return pin cite text and number of extra characters matched.
@@ -964,6 +1090,7 @@ def extract_pin_cite(
         POST_SHORT_CITATION_REGEX,
         prefix=prefix,
         strings_only=True,
+        token_index=token_index,
     )
     if m:
         if m["pin_cite"]:
@@ -981,6 +1108,15 @@ def extract_pin_cite(
     return None, None, None
 
 
+@lru_cache(maxsize=128)
+def _anchored_regex(regex: str, forward: bool, flags: int):
+    """Compile regex anchored at the start of the text if scanning forward,
+    or at the end if scanning backward."""
+    if forward:
+        return re.compile(rf"^(?:{regex})", flags=flags)
+    return re.compile(rf"(?:{regex})$", flags=flags)
+
+
 def match_on_tokens(
     words,
     start_index,
@@ -989,13 +1125,26 @@ def match_on_tokens(
     strings_only=False,
     forward=True,
     flags=re.X,
+    token_index: TokenIndex | None = None,
 ):
     """Scan forward or backward starting from the given index, up to max_chars.
     Return result of matching regex against token text.
     If prefix is provided, start from that text and then add token text.
     If strings_only is True, stop matching at any non-string token; otherwise
     stop matching only at paragraph tokens.
+    If token_index is provided (see `eyecite.models.Document.token_index`),
+    the text is sliced out of it instead of built token by token.
     """
+    compiled_regex = _anchored_regex(regex, forward, flags)
+
+    if token_index is not None and (
+        start_index >= 0 if forward else start_index < len(words)
+    ):
+        text = _slice_tokens(
+            token_index, start_index, prefix, strings_only, forward
+        )
+        return compiled_regex.search(text)
+
     # Build text to match against, starting from prefix
     text = prefix
 
@@ -1003,12 +1152,8 @@ def match_on_tokens(
     # slice for performance to avoid copying list.
     if forward:
         indexes = range(min(start_index, len(words)), len(words))
-        # If scanning forward, regex must match at start
-        regex = rf"^(?:{regex})"
     else:
         indexes = range(max(start_index, -1), -1, -1)
-        # If scanning backward, regex must match at end
-        regex = rf"(?:{regex})$"
 
     # Append text of each token until we reach max_chars or a stop token:
     for index in indexes:
@@ -1034,7 +1179,7 @@ def match_on_tokens(
                 text = text[-MAX_MATCH_CHARS:]
             break
 
-    m = re.search(regex, text, flags=flags)
+    m = compiled_regex.search(text)
     # Useful for debugging regex failures:
     # print(f"Regex: {regex}")
     # print(f"Text: {repr(text)}")
@@ -1042,6 +1187,45 @@ def match_on_tokens(
     return m
 
 
+def _slice_tokens(
+    token_index: TokenIndex,
+    start_index: int,
+    prefix: str,
+    strings_only: bool,
+    forward: bool,
+) -> str:
+    """Get the same text that match_on_tokens builds token by token, by
+    finding the nearest stop token with bisect and slicing the joined text
+    of the tokens in between."""
+    starts = token_index.starts
+    stops = cast(
+        list[int],
+        token_index.token_indexes
+        if strings_only
+        else token_index.paragraph_indexes,
+    )
+    if forward:
+        first = min(start_index, len(token_index.words))
+        i = bisect_left(stops, first)
+        last = stops[i] if i < len(stops) else len(token_index.words)
+        if last == first:
+            return prefix
+        chunk = token_index.text[
+            starts[first] : min(starts[last], starts[first] + MAX_MATCH_CHARS)
+        ]
+        return (prefix + chunk)[:MAX_MATCH_CHARS]
+
+    last = max(start_index, -1) + 1
+    i = bisect_right(stops, last - 1) - 1
+    first = stops[i] + 1 if i >= 0 else 0
+    if last <= first:
+        return prefix
+    chunk = token_index.text[
+        max(starts[first], starts[last] - MAX_MATCH_CHARS) : starts[last]
+    ]
+    return (chunk + prefix)[-MAX_MATCH_CHARS:]
+
+
 def disambiguate_reporters(
     citations: list[CitationBase],
 ) -> list[CitationBase]:
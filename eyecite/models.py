@@ -1,9 +1,12 @@
 import logging
 import re
+import time
+from bisect import bisect_right
 from collections import UserString
 from collections.abc import Callable, Hashable, Iterable, Sequence
-from dataclasses import asdict, dataclass, field
+from dataclasses import asdict, dataclass, field, fields
 from datetime import datetime
+from itertools import accumulate
 from typing import (
     Any,
     Optional,
@@ -19,6 +22,22 @@ logger = logging.getLogger(__name__)
 ResourceType = Hashable
 
 
+def _memoized_hash(obj: Any, state: tuple, get_hash: Callable[[], int]) -> int:
+    """Return get_hash(), reusing the value from the last call for obj as
+    long as state, the attributes the hash depends on, hasn't changed.
+    Citation hashes use hash_sha256, which is too slow to rerun on every
+    __hash__ call: __eq__ compares hashes, and citations are used as dict
+    keys throughout `eyecite.resolve`."""
+    memo: tuple[tuple, int] | None = getattr(obj, "_hash_memo", None)
+    if memo is not None and memo[0] == state:
+        return memo[1]
+    value = get_hash()
+    # set with object.__setattr__ so this also works on frozen dataclasses,
+    # and on the slotted variants in `eyecite.models_slotted`
+    object.__setattr__(obj, "_hash_memo", (state, value))
+    return value
+
+
 @dataclass(eq=True, frozen=True)
 class Reporter:
     """Class for top-level reporters in `reporters_db`, like "S.W." """
@@ -127,10 +146,17 @@ class CitationBase:
 
         FullCaseCitation (see CaseCitation.__hash__() notes)
         """
-        return hash(
-            hash_sha256(
-                {**dict(self.groups.items()), **{"class": type(self).__name__}}
-            )
+        return _memoized_hash(
+            self,
+            (tuple(self.groups.items()),),
+            lambda: hash(
+                hash_sha256(
+                    {
+                        **dict(self.groups.items()),
+                        **{"class": type(self).__name__},
+                    }
+                )
+            ),
         )
 
     def __eq__(self, other):
@@ -164,9 +190,9 @@ class CitationBase:
         return {
             "groups": self.groups,
             "metadata": {
-                k: v
-                for k, v in self.metadata.__dict__.items()
-                if v is not None
+                f.name: getattr(self.metadata, f.name)
+                for f in fields(self.metadata)
+                if getattr(self.metadata, f.name) is not None
             },
         }
 
@@ -267,19 +293,23 @@ class ResourceCitation(CitationBase):
         parent class (CitationBase) objects, except that we also take into
         consideration the all_editions field.
         """
-        return hash(
-            hash_sha256(
-                {
-                    **dict(self.groups.items()),
-                    **{
-                        "all_editions": sorted(
-                            [asdict(e) for e in self.all_editions],
-                            key=lambda d: d["short_name"],  # type: ignore
-                        ),
-                        "class": type(self).__name__,
-                    },
-                }
-            )
+        return _memoized_hash(
+            self,
+            (tuple(self.groups.items()), self.all_editions),
+            lambda: hash(
+                hash_sha256(
+                    {
+                        **dict(self.groups.items()),
+                        **{
+                            "all_editions": sorted(
+                                [asdict(e) for e in self.all_editions],
+                                key=lambda d: d["short_name"],  # type: ignore
+                            ),
+                            "class": type(self).__name__,
+                        },
+                    }
+                )
+            ),
         )
 
     @dataclass(eq=True, unsafe_hash=True)
@@ -379,7 +409,7 @@ class FullLawCitation(FullCitation):
         # pylint: disable=import-outside-toplevel
         from eyecite.helpers import add_law_metadata
 
-        add_law_metadata(self, document.words)
+        add_law_metadata(self, document.words, document.token_index)
         super().add_metadata(document)
 
     def corrected_citation_full(self):
@@ -408,7 +438,7 @@ class FullJournalCitation(FullCitation):
         # pylint: disable=import-outside-toplevel
         from eyecite.helpers import add_journal_metadata
 
-        add_journal_metadata(self, document.words)
+        add_journal_metadata(self, document.words, document.token_index)
         super().add_metadata(document)
 
     def corrected_citation_full(self):
@@ -446,20 +476,24 @@ class CaseCitation(ResourceCitation):
         if self.groups["page"] is None:
             return id(self)
         else:
-            return hash(
-                hash_sha256(
-                    {
-                        **{
-                            k: self.groups[k]
-                            for k in ["volume", "page"]
-                            if k in self.groups
-                        },
-                        **{
-                            "reporter": self.corrected_reporter(),
-                            "class": type(self).__name__,
-                        },
-                    }
-                )
+            return _memoized_hash(
+                self,
+                (tuple(self.groups.items()), self.edition_guess),
+                lambda: hash(
+                    hash_sha256(
+                        {
+                            **{
+                                k: self.groups[k]
+                                for k in ["volume", "page"]
+                                if k in self.groups
+                            },
+                            **{
+                                "reporter": self.corrected_reporter(),
+                                "class": type(self).__name__,
+                            },
+                        }
+                    )
+                ),
             )
 
     @dataclass(eq=True, unsafe_hash=True)
@@ -530,7 +564,7 @@ class FullCaseCitation(CaseCitation, FullCitation):
             find_case_name_in_html,
         )
 
-        add_post_citation(self, document.words)
+        add_post_citation(self, document.words, document.token_index)
 
         if document.markup_text:
             find_case_name_in_html(self, document)
@@ -863,19 +897,93 @@ class Resource(ResourceType):
         NOT considered the same, even if their other attributes are identical.
         This is to avoid potential false positives.
         """
-        return hash(
-            hash_sha256(
-                {
-                    "citation": hash(self.citation),
-                    "class": type(self).__name__,
-                }
-            )
+        citation_hash = hash(self.citation)
+        return _memoized_hash(
+            self,
+            (citation_hash,),
+            lambda: hash(
+                hash_sha256(
+                    {
+                        "citation": citation_hash,
+                        "class": type(self).__name__,
+                    }
+                )
+            ),
         )
 
     def __eq__(self, other):
         return self.__hash__() == other.__hash__()
 
 
+@dataclass(eq=False, repr=False)
+class TokenIndex:
+    """Character offsets for a list of words, so that the text of a run of
+    tokens can be sliced out of their joined text instead of concatenated
+    token by token. Used by `eyecite.helpers.match_on_tokens`."""
+
+    words: Tokens
+    # sorted indexes of words that are Tokens rather than strings; found
+    # by scanning words if not provided
+    token_indexes: list[int] | None = None
+    # the text of all words joined together
+    text: str = field(init=False)
+    # starts[i] is the offset of words[i] in text; starts[-1] is len(text)
+    starts: list[int] = field(init=False)
+    # sorted indexes of words that are ParagraphTokens
+    paragraph_indexes: list[int] = field(init=False)
+
+    def __post_init__(self):
+        words = self.words
+        if self.token_indexes is None:
+            self.token_indexes = [
+                i for i, word in enumerate(words) if not isinstance(word, str)
+            ]
+        strings = [
+            word if isinstance(word, str) else str(word) for word in words
+        ]
+        self.text = "".join(strings)
+        self.starts = list(accumulate(map(len, strings), initial=0))
+        self.paragraph_indexes = [
+            i
+            for i in self.token_indexes
+            if isinstance(words[i], ParagraphToken)
+        ]
+
+
+@dataclass(eq=False, repr=False)
+class EmphasisTagIndex:
+    """Lookup of `Document.emphasis_tags` by markup offset. The tags found
+    by `Document.identify_emphasis_tags` are sorted and don't overlap, so
+    the tag containing an offset can be found with bisect."""
+
+    tags: list[tuple[str, int, int]]
+    # start offset of each tag
+    starts: list[int] = field(init=False)
+    # whether tags are sorted and don't overlap; if not, lookups fall back
+    # to scanning all tags
+    disjoint: bool = field(init=False)
+    # (start, end) of tags in markup -> (start, end) in plain text
+    plain_spans: dict[tuple[int, int], tuple[int, int]] = field(
+        init=False, default_factory=dict
+    )
+
+    def __post_init__(self):
+        self.starts = [tag[1] for tag in self.tags]
+        self.disjoint = all(tag[1] <= tag[2] for tag in self.tags) and all(
+            tag[2] <= next_tag[1]
+            for tag, next_tag in zip(self.tags, self.tags[1:])
+        )
+
+    def tags_at(self, markup_loc: int) -> list[tuple[str, int, int]]:
+        """Return the tags that contain markup_loc."""
+        if not self.disjoint:
+            return [t for t in self.tags if t[1] <= markup_loc < t[2]]
+        i = bisect_right(self.starts, markup_loc) - 1
+        if i >= 0 and markup_loc < self.tags[i][2]:
+            return [self.tags[i]]
+        return []
+
+
 @dataclass(eq=False, unsafe_hash=False)
 class Document:
     """A class to encapsulate the source text and the pre-processing applied to
@@ -896,6 +1004,16 @@ class Document:
     )
     emphasis_tags: list[tuple[str, int, int]] = field(default_factory=list)
     source_text: str = ""  # will be useful for the annotation step
+    # set if a deadline or size limit stopped processing early
+    truncated: bool = field(default=False, init=False)
+    _token_index: TokenIndex | None = field(
+        default=None, init=False, repr=False
+    )
+    _emphasis_tag_index: EmphasisTagIndex | None = field(
+        default=None, init=False, repr=False
+    )
+    # built and used by `eyecite.helpers.find_case_name`
+    _case_name_index: Any = field(default=None, init=False, repr=False)
 
     def __post_init__(self):
         from eyecite.utils import placeholder_markup
@@ -921,12 +1039,14 @@ class Document:
             # attribute characters (e.g., in id or index). ex. <span> <XXXX>
             placeholder_markup = placeholder_markup(self.markup_text)
 
-            self.plain_to_markup = SpanUpdater(
+            # The placeholder markup has the same offsets as the markup, so a
+            # single diff gives both directions. markup_to_plain is the
+            # inverse of that diff rather than a diff of its own, so tag
+            # offsets inside changed ranges, like the starts of emphasis
+            # tags, may land on the other side of adjacent whitespace.
+            self.plain_to_markup, self.markup_to_plain = SpanUpdater.pair(
                 self.plain_text, placeholder_markup
             )
-            self.markup_to_plain = SpanUpdater(
-                self.markup_text, self.plain_text
-            )
 
             self.identify_emphasis_tags()
 
@@ -953,7 +1073,50 @@ class Document:
             for m in pattern.finditer(self.markup_text)
         ]
 
-    def tokenize(self, tokenizer):
+    @property
+    def token_index(self) -> TokenIndex:
+        """A TokenIndex of self.words, built on first use."""
+        if (
+            self._token_index is None
+            or self._token_index.words is not self.words
+        ):
+            # citation_tokens holds every non-string word with its index
+            self._token_index = TokenIndex(
+                self.words, [i for i, _ in self.citation_tokens]
+            )
+        return self._token_index
+
+    @property
+    def emphasis_tag_index(self) -> EmphasisTagIndex:
+        """An EmphasisTagIndex of self.emphasis_tags, built on first use."""
+        if (
+            self._emphasis_tag_index is None
+            or self._emphasis_tag_index.tags is not self.emphasis_tags
+        ):
+            self._emphasis_tag_index = EmphasisTagIndex(self.emphasis_tags)
+        return self._emphasis_tag_index
+
+    def tokenize(
+        self,
+        tokenizer,
+        deadline: float | None = None,
+        max_chars: int | None = None,
+    ):
         """Tokenize the document and store the results in the document
-        object"""
-        self.words, self.citation_tokens = tokenizer.tokenize(self.plain_text)
+        object. See `eyecite.tokenizers.Tokenizer.tokenize` for deadline and
+        max_chars; if either cuts tokenization short, self.truncated is
+        set."""
+        limits: dict[str, Any] = {}
+        if deadline is not None:
+            limits["deadline"] = deadline
+        if max_chars is not None:
+            limits["max_chars"] = max_chars
+        # only pass limits when set, so custom tokenizers that don't
+        # support them keep working
+        self.words, self.citation_tokens = tokenizer.tokenize(
+            self.plain_text, **limits
+        )
+        if (max_chars is not None and len(self.plain_text) > max_chars) or (
+            deadline is not None and time.monotonic() > deadline
+        ):
+            self.truncated = True
@@ -0,0 +1,236 @@
+"""Slotted variants of the citation classes in `eyecite.models` and
+`eyecite.models_extended`, for holding large numbers of citations in memory.
+
+Regular citations and their metadata each keep their attributes in a
+`__dict__`. The variants here are the same dataclasses with `__slots__`
+instead, which saves about 100 bytes, or a quarter of the memory used by
+a citation and its metadata objects. They have the same fields, methods,
+hashes and reprs as the classes they mirror, but are not subclasses of
+them, since a subclass would keep the `__dict__`. Code that checks
+`isinstance` against `eyecite.models` classes doesn't recognize them, so
+convert them back with `from_slotted` before passing them to
+`eyecite.resolve.resolve_citations`, which raises TypeError otherwise.
+Functions that only read spans, such as
+`eyecite.annotate.annotate_citations`, accept their spans directly:
+
+>>> slotted = [to_slotted(citation) for citation in get_citations(text)]
+>>> citations = [from_slotted(citation) for citation in slotted]
+"""
+
+import types
+from dataclasses import Field, dataclass, field, fields, is_dataclass
+from typing import Any
+
+from eyecite import models, models_extended
+
+# slotted variant of each class, and the class of each variant
+_variants: dict[type, type] = {}
+_originals: dict[type, type] = {}
+
+# class attributes not copied from the original class
+_SKIPPED_ATTRIBUTES = {
+    "__module__",
+    "__dict__",
+    "__weakref__",
+    "__slots__",
+    "__dataclass_fields__",
+    "__dataclass_params__",
+    "__match_args__",
+    "__annotations__",
+}
+
+
+def slotted_variant(cls: type) -> type:
+    """Return the slotted variant of a citation class, or of a citation's
+    Metadata class, creating it and the variants of its bases on first use.
+
+    Args:
+        cls: A dataclass from `eyecite.models`, or a subclass of one.
+
+    Returns:
+        A slotted dataclass with the same fields and methods as cls.
+
+    Raises:
+        TypeError: If cls isn't a dataclass, or is frozen or ordered.
+    """
+    if cls in _variants:
+        return _variants[cls]
+    if not is_dataclass(cls):
+        raise TypeError(f"{cls.__name__} is not a dataclass")
+    params = cls.__dataclass_params__  # type: ignore[attr-defined]
+    if params.frozen or params.order:
+        raise TypeError(f"{cls.__name__} is frozen or ordered")
+
+    bases = tuple(
+        base if base is object else slotted_variant(base)
+        for base in cls.__bases__
+    )
+    own_fields: dict[str, Field] = {
+        name: cls.__dataclass_fields__[name]  # type: ignore[attr-defined]
+        for name in cls.__dict__.get("__annotations__", {})
+    }
+    namespace: dict[str, Any] = {
+        "__module__": __name__,
+        "__qualname__": cls.__qualname__,
+        "__annotations__": dict(cls.__dict__.get("__annotations__", {})),
+    }
+    for name, value in cls.__dict__.items():
+        if name in _SKIPPED_ATTRIBUTES or name in own_fields:
+            continue
+        if name == "__hash__" and value is None:
+            continue
+        if name == "Metadata" and isinstance(value, type):
+            value = slotted_variant(value)
+        namespace[name] = value
+    for name, own_field in own_fields.items():
+        namespace[name] = _copy_field(own_field)
+    if bases == (object,) and issubclass(cls, models.CitationBase):
+        # room for the hash memo that regular citations keep in __dict__
+        namespace["__annotations__"]["_hash_memo"] = Any
+        namespace["_hash_memo"] = field(
+            default=None, init=False, repr=False, compare=False
+        )
+
+    # Methods are copied rather than inherited, since inheriting from the
+    # original class would bring back its __dict__. That includes the
+    # methods dataclass() generated for it, which only use the fields by
+    # name, and which dataclass() keeps rather than generating again;
+    # unsafe_hash is left off so that it keeps a copied __hash__ too.
+    variant: type = dataclass(  # type: ignore[call-overload]
+        types.new_class(
+            cls.__name__, bases, exec_body=lambda ns: ns.update(namespace)
+        ),
+        init=params.init,
+        repr=params.repr,
+        eq=params.eq,
+        slots=True,
+    )
+    _bind_class_cells(variant)
+    _variants[cls] = variant
+    _originals[variant] = cls
+    return variant
+
+
+def _copy_field(original: Field) -> Field:
+    """Return a new field with the same options as original."""
+    new_field: Field = field(  # type: ignore[call-overload]
+        default=original.default,
+        default_factory=original.default_factory,
+        init=original.init,
+        repr=original.repr,
+        hash=original.hash,
+        compare=original.compare,
+        metadata=original.metadata,
+        kw_only=original.kw_only,
+    )
+    return new_field
+
+
+def _bind_class_cells(variant: type) -> None:
+    """Point the `__class__` cells of methods copied into variant, which
+    zero-argument super() relies on, at variant instead of the original
+    class. The methods are rebuilt with the `types.FunctionType` and
+    `types.CellType` constructors rather than by changing the cells, which
+    the original class's methods share."""
+    for name, value in list(vars(variant).items()):
+        code = getattr(value, "__code__", None)
+        if code is None or "__class__" not in code.co_freevars:
+            continue
+        closure = tuple(
+            types.CellType(variant) if free_name == "__class__" else cell
+            for free_name, cell in zip(code.co_freevars, value.__closure__)
+        )
+        method = types.FunctionType(
+            code,
+            value.__globals__,
+            value.__name__,
+            value.__defaults__,
+            closure,
+        )
+        method.__kwdefaults__ = value.__kwdefaults__
+        method.__qualname__ = value.__qualname__
+        method.__doc__ = value.__doc__
+        setattr(variant, name, method)
+
+
+def _convert(obj: Any, cls: type) -> Any:
+    """Copy the dataclass fields of obj into a new instance of cls, without
+    running its __init__."""
+    converted: Any = object.__new__(cls)
+    for obj_field in fields(obj):
+        if obj_field.name == "_hash_memo":
+            continue
+        value = getattr(obj, obj_field.name)
+        if obj_field.name == "metadata" and is_dataclass(value):
+            value = _convert(value, _metadata_class(cls, value))
+        object.__setattr__(converted, obj_field.name, value)
+    return converted
+
+
+def _metadata_class(cls: type, metadata: Any) -> type:
+    """Return the class to convert a citation's metadata to, for a citation
+    converted to cls."""
+    if cls in _originals:
+        return slotted_variant(type(metadata))
+    return _originals.get(type(metadata), type(metadata))
+
+
+def to_slotted(citation: models.CitationBase) -> Any:
+    """Return a slotted copy of a citation, sharing its token, groups and
+    document.
+
+    Args:
+        citation: A citation returned by `eyecite.find.get_citations`.
+
+    Returns:
+        An instance of the slotted variant of the citation's class.
+    """
+    return _convert(citation, slotted_variant(type(citation)))
+
+
+def from_slotted(citation: Any) -> models.CitationBase:
+    """Return a regular copy of a citation made by `to_slotted`.
+
+    Args:
+        citation: A slotted citation.
+
+    Returns:
+        An instance of the citation class the slotted citation mirrors.
+    """
+    converted: models.CitationBase = _convert(
+        citation, _originals[type(citation)]
+    )
+    return converted
+
+
+# Variants of the built-in citation classes, also so that slotted citations
+# can be pickled
+CitationBase = slotted_variant(models.CitationBase)
+ResourceCitation = slotted_variant(models.ResourceCitation)
+FullCitation = slotted_variant(models.FullCitation)
+FullLawCitation = slotted_variant(models.FullLawCitation)
+FullJournalCitation = slotted_variant(models.FullJournalCitation)
+CaseCitation = slotted_variant(models.CaseCitation)
+FullCaseCitation = slotted_variant(models.FullCaseCitation)
+ShortCaseCitation = slotted_variant(models.ShortCaseCitation)
+SupraCitation = slotted_variant(models.SupraCitation)
+IdCitation = slotted_variant(models.IdCitation)
+ReferenceCitation = slotted_variant(models.ReferenceCitation)
+UnknownCitation = slotted_variant(models.UnknownCitation)
+BaseCitation = slotted_variant(models_extended.BaseCitation)
+ConstitutionCitation = slotted_variant(models_extended.ConstitutionCitation)
+RegulationCitation = slotted_variant(models_extended.RegulationCitation)
+CourtRuleCitation = slotted_variant(models_extended.CourtRuleCitation)
+LegislativeBillCitation = slotted_variant(
+    models_extended.LegislativeBillCitation
+)
+SessionLawCitation = slotted_variant(models_extended.SessionLawCitation)
+JournalArticleCitation = slotted_variant(
+    models_extended.JournalArticleCitation
+)
+ScientificIdentifierCitation = slotted_variant(
+    models_extended.ScientificIdentifierCitation
+)
+AttorneyGeneralCitation = slotted_variant(
+    models_extended.AttorneyGeneralCitation
+)
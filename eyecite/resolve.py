@@ -1,10 +1,16 @@
+import copyreg
+import io
+import pickle
 import re
 from collections import defaultdict
-from collections.abc import Callable
-from typing import cast
+from collections.abc import Callable, Hashable, Iterable
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, cast
 
 from eyecite.models import (
     CitationBase,
+    Document,
     FullCaseCitation,
     FullCitation,
     IdCitation,
@@ -27,6 +33,84 @@ Resolutions = dict[ResourceType, list[CitationBase]]
 MAX_OPINION_PAGE_COUNT = 150
 
 
+class _IndexedFullCites(list):
+    """The list of resolved full citations built by resolve_citations, with
+    indexes that let the default resolvers look up candidates instead of
+    scanning every full citation. It is passed to custom resolvers like a
+    plain list; the indexes are only updated by append(), and assume that
+    citation metadata doesn't change during resolution."""
+
+    def __init__(self):
+        super().__init__()
+        # (corrected reporter, volume) -> resolved FullCaseCitations
+        self.by_reporter_volume: dict[
+            tuple[str, str | None], ResolvedFullCites
+        ] = defaultdict(list)
+        # The name indexes are only needed for supra and reference
+        # citations, so they are brought up to date lazily, covering the
+        # first `names_indexed` full citations.
+        self.names_indexed = 0
+        # metadata value -> positions of the full citations with that value
+        self.by_metadata_value: dict[Any, list[int]] = defaultdict(list)
+        # three-character substring of a plaintiff or defendant ->
+        # positions of the FullCaseCitations with that party name
+        self.by_name_trigram: dict[str, set[int]] = defaultdict(set)
+
+    def append(self, resolved_full_cite: ResolvedFullCite) -> None:
+        super().append(resolved_full_cite)
+        full_citation = resolved_full_cite[0]
+        if isinstance(full_citation, FullCaseCitation):
+            key = (
+                full_citation.corrected_reporter(),
+                full_citation.groups.get("volume"),
+            )
+            self.by_reporter_volume[key].append(resolved_full_cite)
+
+    def _update_name_indexes(self) -> None:
+        for i in range(self.names_indexed, len(self)):
+            full_citation = self[i][0]
+            for value in {
+                value
+                for value in full_citation.metadata.__dict__.values()
+                if value
+            }:
+                self.by_metadata_value[value].append(i)
+            if isinstance(full_citation, FullCaseCitation):
+                for name in (
+                    full_citation.metadata.plaintiff,
+                    full_citation.metadata.defendant,
+                ):
+                    for j in range(len(name or "") - 2):
+                        self.by_name_trigram[name[j : j + 3]].add(i)
+        self.names_indexed = len(self)
+
+    def name_candidates(self, name: str) -> ResolvedFullCites:
+        """Return the full citations whose plaintiff or defendant could
+        contain name: a superset of the actual matches, in order."""
+        if len(name) < 3:
+            return self
+        self._update_name_indexes()
+        # every match contains every trigram of name, so the citations
+        # with its rarest trigram are enough
+        positions: set[int] | None = None
+        for i in range(len(name) - 2):
+            posting = self.by_name_trigram.get(name[i : i + 3])
+            if not posting:
+                return []
+            if positions is None or len(posting) < len(positions):
+                positions = posting
+        return [self[i] for i in sorted(positions or ())]
+
+    def value_candidates(self, values: set) -> ResolvedFullCites:
+        """Return the full citations with any of the given metadata values,
+        in order."""
+        self._update_name_indexes()
+        positions: set[int] = set()
+        for value in values:
+            positions.update(self.by_metadata_value.get(value, ()))
+        return [self[i] for i in sorted(positions)]
+
+
 def resolve_full_citation(full_citation: FullCitation) -> Resource:
     """By default, resolve `eyecite.models.FullCaseCitation` objects to a
     generic (but reference-unique) `eyecite.models.Resource` object. This
@@ -66,6 +150,8 @@ def _filter_by_matching_antecedent(
 ) -> ResourceType | None:
     matches: list[ResourceType] = []
     ag: str = strip_punct(antecedent_guess)
+    if isinstance(resolved_full_cites, _IndexedFullCites):
+        resolved_full_cites = resolved_full_cites.name_candidates(ag)
     for full_citation, resource in resolved_full_cites:
         if not isinstance(full_citation, FullCaseCitation):
             continue
@@ -96,6 +182,10 @@ def _filter_by_matching_plaintiff_or_defendant_or_resolved_names(
         if reference_value:
             reference_values.add(reference_value)
 
+    if isinstance(resolved_full_cites, _IndexedFullCites):
+        resolved_full_cites = resolved_full_cites.value_candidates(
+            reference_values
+        )
     for citation, resource in resolved_full_cites:
         full_cite_values = {
             value for value in citation.metadata.__dict__.values() if value
@@ -157,16 +247,23 @@ def _resolve_shortcase_citation(
     or plaintiff field of any of the previously resolved full citations.
     """
     candidates: ResolvedFullCites = []
-    for full_citation, resource in resolved_full_cites:
-        if (
-            isinstance(full_citation, FullCaseCitation)
-            and short_citation.corrected_reporter()
-            == full_citation.corrected_reporter()
-            and short_citation.groups.get("volume")
-            == full_citation.groups.get("volume")
-        ):
-            # Append both keys and values for further refinement below
-            candidates.append((full_citation, resource))
+    if isinstance(resolved_full_cites, _IndexedFullCites):
+        key = (
+            short_citation.corrected_reporter(),
+            short_citation.groups.get("volume"),
+        )
+        candidates = list(resolved_full_cites.by_reporter_volume.get(key, []))
+    else:
+        for full_citation, resource in resolved_full_cites:
+            if (
+                isinstance(full_citation, FullCaseCitation)
+                and short_citation.corrected_reporter()
+                == full_citation.corrected_reporter()
+                and short_citation.groups.get("volume")
+                == full_citation.groups.get("volume")
+            ):
+                # Append both keys and values for further refinement below
+                candidates.append((full_citation, resource))
 
     # Remove duplicates and only accept if one candidate remains
     if len({resource for full_citation, resource in candidates}) == 1:
@@ -307,12 +404,17 @@ def resolve_citations(
     Returns:
         A dictionary mapping `eyecite.models.ResourceType` objects (the keys)
             to lists of `eyecite.models.CitationBase` objects (the values).
+
+    Raises:
+        TypeError: If a citation isn't an `eyecite.models.CitationBase`, such
+            as a slotted citation from `eyecite.models_slotted`.
     """
     # Dict of all citation resolutions
     resolutions: Resolutions = defaultdict(list)
 
-    # Dict mapping full citations to their resolved resources
-    resolved_full_cites: ResolvedFullCites = []
+    # List of full citations and their resolved resources, indexed for the
+    # default resolvers
+    resolved_full_cites: ResolvedFullCites = _IndexedFullCites()
 
     # The resource of the most recently resolved citation, if any
     last_resolution: ResourceType | None = None
@@ -346,12 +448,125 @@ def resolve_citations(
             )
 
         # If the citation is to an unknown document, ignore for now
-        else:
+        elif isinstance(citation, CitationBase):
             resolution = None
 
+        else:
+            raise TypeError(
+                f"{type(citation).__name__} is not an eyecite.models "
+                "citation; convert slotted citations with "
+                "eyecite.models_slotted.from_slotted first"
+            )
+
         last_resolution = resolution
         if resolution:
             # Record the citation in the appropriate list
             resolutions[resolution].append(citation)
 
     return resolutions
+
+
+def _no_document() -> None:
+    return None
+
+
+def _dump_payload(citations: list[CitationBase]) -> bytes:
+    """Pickle citations to send to a worker process. Documents are left
+    behind, since resolution doesn't need their tokens and text. They are
+    dropped with a dispatch table rather than persistent_id(), which would
+    be called for every object pickled."""
+    out = io.BytesIO()
+    pickler = pickle.Pickler(out, protocol=pickle.HIGHEST_PROTOCOL)
+    pickler.dispatch_table = {
+        **copyreg.dispatch_table,
+        Document: lambda document: (_no_document, ()),
+    }
+    pickler.dump(citations)
+    return out.getvalue()
+
+
+class _ResultPickler(pickle.Pickler):
+    """Pickler for resolutions sent back from a worker process, storing
+    each citation as its position in the document's list of citations so
+    that the caller's own citation objects can be swapped back in."""
+
+    def __init__(self, file, citations: list[CitationBase]):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.positions = {id(c): i for i, c in enumerate(citations)}
+
+    def persistent_id(self, obj):
+        if isinstance(obj, CitationBase) and id(obj) in self.positions:
+            return self.positions[id(obj)]
+        return None
+
+
+class _ResultUnpickler(pickle.Unpickler):
+    def __init__(self, file, citations: list[CitationBase]):
+        super().__init__(file)
+        self.citations = citations
+
+    def persistent_load(self, pid):
+        return self.citations[pid]
+
+
+def _resolve_payload(payload: bytes, hooks: dict[str, Callable]) -> bytes:
+    """Resolve one document's pickled citations in a worker process."""
+    citations = pickle.loads(payload)
+    resolutions = resolve_citations(citations, **hooks)
+    out = io.BytesIO()
+    _ResultPickler(out, citations).dump(list(resolutions.items()))
+    return out.getvalue()
+
+
+def resolve_citations_batch(
+    batch: Iterable[tuple[Hashable, list[CitationBase]]],
+    max_workers: int | None = None,
+    chunksize: int = 8,
+    **hooks: Callable,
+) -> dict[Hashable, Resolutions]:
+    """Resolve the citations of many documents in a pool of worker
+    processes, like calling `resolve_citations` on each document. Lookup
+    tables such as the reporter and court data are loaded once per worker
+    and reused for every document it resolves.
+
+    Citations are sent to the workers without their `document`, so custom
+    resolvers can't rely on it, and resolvers must be picklable (such as
+    module-level functions). Resources are created in the workers, but the
+    resolutions returned, and any resources that refer to citations, hold
+    the caller's own citation objects.
+
+    Args:
+        batch: An iterable of (document id, citations) pairs, where the
+            citations are returned from calling `eyecite.find.get_citations`
+            on the document.
+        max_workers: The number of worker processes, defaulting to the
+            number of CPUs. If 1, documents are resolved in this process.
+        chunksize: The number of documents sent to a worker at a time.
+        **hooks: Custom resolvers, passed to `resolve_citations` as keyword
+            arguments.
+
+    Returns:
+        A dictionary mapping each document id to the resolutions returned
+            by `resolve_citations` for its citations, in the order of batch.
+    """
+    batch = list(batch)
+    if max_workers == 1:
+        return {
+            document_id: resolve_citations(citations, **hooks)
+            for document_id, citations in batch
+        }
+
+    payloads = [_dump_payload(citations) for _, citations in batch]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(
+            partial(_resolve_payload, hooks=hooks),
+            payloads,
+            chunksize=chunksize,
+        )
+        return {
+            document_id: dict(
+                _ResultUnpickler(io.BytesIO(result), citations).load()
+            )
+            for (document_id, citations), result in zip(batch, results)
+        }
@@ -0,0 +1,485 @@
+import json
+import struct
+from collections.abc import Iterable
+from dataclasses import MISSING, fields
+from datetime import datetime
+from functools import cache
+from typing import Any
+
+from eyecite.models import CitationBase, Edition, Reporter, Token
+
+# Bump this if the format of serialized citations changes, so that old data
+# is rejected rather than misread.
+FORMAT_VERSION = 2
+
+FORMAT_NAME = "eyecite.citations"
+
+# fields of citations and tokens that hold editions
+EDITION_FIELDS = {"exact_editions", "variation_editions", "edition_guess"}
+
+# fields that are rebuilt by the citation's __post_init__, or not kept
+_SKIPPED_FIELDS = {"document", "all_editions", "groups", "_hash_memo"}
+
+# results of _class_by_name, by base class and name
+_classes_by_name: dict[tuple[type, str], type] = {}
+
+# results of _field_defaults, by class
+_field_defaults_cache: dict[type, tuple[tuple[str, Any], ...]] = {}
+
+
+def citation_to_dict(citation: CitationBase) -> dict[str, Any]:
+    """Convert a citation to a dictionary of JSON-compatible values.
+
+    The dictionary holds the citation's class name under "type", its token
+    (see `token_to_dict`), its metadata values that aren't None, and every
+    other field whose value differs from the field's default, except the
+    citation's `document`. Editions are stored by short name, as described
+    in `edition_key`.
+
+    Args:
+        citation: A citation returned by `eyecite.find.get_citations`.
+
+    Returns:
+        A dictionary that `citation_from_dict` converts back.
+    """
+    data: dict[str, Any] = {"type": type(citation).__name__}
+    for name, default in _field_defaults(type(citation)):
+        if name in _SKIPPED_FIELDS:
+            continue
+        value = getattr(citation, name)
+        if name == "token":
+            data["token"] = token_to_dict(value)
+        elif name == "metadata":
+            data["metadata"] = {
+                metadata_name: metadata_value
+                for metadata_name, _ in _field_defaults(type(value))
+                if (metadata_value := getattr(value, metadata_name))
+                is not None
+            }
+        elif default is MISSING or value != default:
+            data[name] = _encode_field(name, value)
+    if citation.groups != citation.token.groups:
+        data["groups"] = dict(citation.groups)
+    return data
+
+
+def citation_from_dict(data: dict[str, Any]) -> CitationBase:
+    """Rebuild a citation from the dictionary made by `citation_to_dict`,
+    without tokenizing any text. The citation has no `document`.
+
+    Args:
+        data: A dictionary returned by `citation_to_dict`.
+
+    Returns:
+        A citation equal to the one the dictionary was made from.
+
+    Raises:
+        ValueError: If the data names an unknown class or edition.
+    """
+    data = dict(data)
+    cls = _class_by_name(CitationBase, data.pop("type"))
+    token = token_from_dict(data.pop("token"))
+    groups = data.pop("groups", None)
+    citation: CitationBase = cls(
+        token=token,
+        **{name: _decode_field(name, value) for name, value in data.items()},
+    )
+    if groups is not None:
+        citation.groups = groups
+    return citation
+
+
+def token_to_dict(token: Token) -> dict[str, Any]:
+    """Convert a token to a dictionary of JSON-compatible values, holding
+    its class name under "type", its text under "data", and its other
+    fields."""
+    data: dict[str, Any] = {"type": type(token).__name__}
+    for name, default in _field_defaults(type(token)):
+        value = getattr(token, name)
+        if default is MISSING or value != default:
+            data[name] = _encode_field(name, value)
+    return data
+
+
+def token_from_dict(data: dict[str, Any]) -> Token:
+    """Rebuild a token from the dictionary made by `token_to_dict`."""
+    data = dict(data)
+    cls = _class_by_name(Token, data.pop("type"))
+    token: Token = cls(
+        **{name: _decode_field(name, value) for name, value in data.items()}
+    )
+    return token
+
+
+def dumps_jsonl(citations: Iterable[CitationBase]) -> str:
+    """Serialize citations as JSON Lines: a header line with the format
+    version, then one line per citation.
+
+    Args:
+        citations: Citations returned by `eyecite.find.get_citations`.
+
+    Returns:
+        The JSON Lines text, ending with a newline.
+    """
+    header = {"format": FORMAT_NAME, "version": FORMAT_VERSION}
+    lines = [json.dumps(header)]
+    lines.extend(
+        json.dumps(citation_to_dict(citation), ensure_ascii=False)
+        for citation in citations
+    )
+    return "\n".join(lines) + "\n"
+
+
+def loads_jsonl(data: str | Iterable[str]) -> list[CitationBase]:
+    """Rebuild the citations serialized by `dumps_jsonl`.
+
+    Args:
+        data: The JSON Lines text, or an iterable of its lines, such as an
+            open file.
+
+    Returns:
+        The citations, in the order they were serialized.
+
+    Raises:
+        ValueError: If the data isn't in this version of the format.
+    """
+    lines = data.splitlines() if isinstance(data, str) else data
+    records = (json.loads(line) for line in lines if line.strip())
+    _check_header(next(records, None))
+    return [citation_from_dict(record) for record in records]
+
+
+def dumps_msgpack(citations: Iterable[CitationBase]) -> bytes:
+    """Serialize citations in MessagePack, as a map holding the format
+    version and an array of the dictionaries made by `citation_to_dict`.
+    Any MessagePack library can read the result.
+
+    Args:
+        citations: Citations returned by `eyecite.find.get_citations`.
+
+    Returns:
+        The encoded bytes.
+
+    Raises:
+        TypeError: If a citation holds a value that can't be encoded, such
+            as an integer outside the signed 64-bit range.
+    """
+    out = bytearray()
+    _pack(
+        {
+            "format": FORMAT_NAME,
+            "version": FORMAT_VERSION,
+            "citations": [citation_to_dict(c) for c in citations],
+        },
+        out,
+    )
+    return bytes(out)
+
+
+def loads_msgpack(data: bytes) -> list[CitationBase]:
+    """Rebuild the citations serialized by `dumps_msgpack`.
+
+    Args:
+        data: The encoded bytes.
+
+    Returns:
+        The citations, in the order they were serialized.
+
+    Raises:
+        ValueError: If the data isn't valid, or isn't in this version of
+            the format.
+    """
+    try:
+        value, end = _unpack(bytes(data), 0)
+    except (IndexError, struct.error, UnicodeDecodeError) as e:
+        raise ValueError("Invalid MessagePack data") from e
+    if end != len(data):
+        raise ValueError("Invalid MessagePack data")
+    _check_header(value)
+    records = value.get("citations")
+    if not isinstance(records, list) or not all(
+        isinstance(record, dict) for record in records
+    ):
+        raise ValueError("Invalid citation data")
+    return [citation_from_dict(record) for record in records]
+
+
+def edition_key(edition: Edition) -> str | list | dict:
+    """Return the short name that an edition is serialized as, such as
+    "F.2d". Some reporters share a short name, like the two "Wash."
+    reporters; their editions are serialized as a list of the short name,
+    the reporter's name and the edition's start date, which tell them apart
+    regardless of the order of reporters-db. Editions that aren't in
+    reporters-db are serialized as a dictionary of their fields.
+    """
+    editions = _editions_by_name().get(edition.short_name, ())
+    if editions == (edition,):
+        return edition.short_name
+    if edition in editions:
+        return [
+            edition.short_name,
+            edition.reporter.name,
+            edition.start and edition.start.isoformat(),
+        ]
+    reporter = edition.reporter
+    return {
+        "short_name": edition.short_name,
+        "start": edition.start and edition.start.isoformat(),
+        "end": edition.end and edition.end.isoformat(),
+        "reporter": {
+            "short_name": reporter.short_name,
+            "name": reporter.name,
+            "cite_type": reporter.cite_type,
+            "source": reporter.source,
+        },
+    }
+
+
+def edition_from_key(key: str | list | dict) -> Edition:
+    """Return the edition that `edition_key` returned key for.
+
+    Raises:
+        ValueError: If no edition in reporters-db, or more than one, matches
+            the key.
+    """
+    if isinstance(key, dict):
+        return Edition(
+            reporter=Reporter(**key["reporter"]),
+            short_name=key["short_name"],
+            start=key["start"] and datetime.fromisoformat(key["start"]),
+            end=key["end"] and datetime.fromisoformat(key["end"]),
+        )
+    if isinstance(key, str):
+        editions = _editions_by_name().get(key, ())
+    else:
+        name, reporter_name, start = key
+        editions = tuple(
+            edition
+            for edition in _editions_by_name().get(name, ())
+            if edition.reporter.name == reporter_name
+            and (edition.start and edition.start.isoformat()) == start
+        )
+    if len(editions) != 1:
+        raise ValueError(f"Unknown edition {key!r}")
+    return editions[0]
+
+
+@cache
+def _editions_by_name() -> dict[str, tuple[Edition, ...]]:
+    """Return the editions in reporters-db by short name."""
+    # pylint: disable=import-outside-toplevel
+    from eyecite.tokenizers import EDITIONS_LOOKUP
+
+    by_name: dict[str, dict[Edition, None]] = {}
+    for editions in EDITIONS_LOOKUP.values():
+        for edition in editions:
+            by_name.setdefault(edition.short_name, {})[edition] = None
+    return {name: tuple(editions) for name, editions in by_name.items()}
+
+
+def _class_by_name(base: type, name: str) -> type:
+    """Return the subclass of base, or base itself, called name, preferring
+    classes closer to base."""
+    cls = _classes_by_name.get((base, name))
+    if cls is not None:
+        return cls
+    classes = [base]
+    for cls in classes:
+        if cls.__name__ == name:
+            _classes_by_name[base, name] = cls
+            return cls
+        classes.extend(cls.__subclasses__())
+    raise ValueError(f"Unknown {base.__name__} class {name!r}")
+
+
+def _field_defaults(cls: type) -> tuple[tuple[str, Any], ...]:
+    """Return the name and default value of each field of a dataclass, with
+    MISSING for fields without a default."""
+    defaults = _field_defaults_cache.get(cls)
+    if defaults is None:
+        defaults = tuple(
+            (
+                dataclass_field.name,
+                dataclass_field.default
+                if dataclass_field.default_factory is MISSING
+                else dataclass_field.default_factory(),
+            )
+            for dataclass_field in fields(cls)
+        )
+        _field_defaults_cache[cls] = defaults
+    return defaults
+
+
+def _encode_field(name: str, value: Any) -> Any:
+    if name not in EDITION_FIELDS or value is None:
+        return value
+    if isinstance(value, Edition):
+        return edition_key(value)
+    return [edition_key(edition) for edition in value]
+
+
+def _decode_field(name: str, value: Any) -> Any:
+    if name not in EDITION_FIELDS or value is None:
+        return value
+    if name == "edition_guess":
+        return edition_from_key(value)
+    return tuple(edition_from_key(key) for key in value)
+
+
+def _check_header(header: Any) -> None:
+    if not isinstance(header, dict) or header.get("format") != FORMAT_NAME:
+        raise ValueError("Data is not in the eyecite citation format")
+    if header.get("version") != FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported citation format version {header.get('version')}"
+        )
+
+
+# MessagePack encoding, for the value types in citation dictionaries
+
+
+def _pack(value: Any, out: bytearray) -> None:
+    """Append the MessagePack encoding of value to out."""
+    value_type = type(value)
+    if value_type is str:
+        encoded = value.encode("utf8")
+        size = len(encoded)
+        if size < 0x20:
+            out.append(0xA0 | size)
+        elif size < 0x100:
+            out += bytes((0xD9, size))
+        elif size < 0x10000:
+            out += struct.pack(">BH", 0xDA, size)
+        else:
+            out += struct.pack(">BI", 0xDB, size)
+        out += encoded
+    elif value_type is dict:
+        _pack_size(len(value), 0x80, 0xDE, out)
+        for key, item in value.items():
+            _pack(key, out)
+            _pack(item, out)
+    elif value is None:
+        out.append(0xC0)
+    elif value_type is bool:
+        out.append(0xC3 if value else 0xC2)
+    elif value_type is int:
+        if 0 <= value < 0x80:
+            out.append(value)
+        elif -0x20 <= value < 0:
+            out.append(value + 0x100)
+        elif 0 <= value < 0x1_0000_0000:
+            out += struct.pack(">BI", 0xCE, value)
+        elif -0x8000_0000 <= value < 0:
+            out += struct.pack(">Bi", 0xD2, value)
+        elif -0x8000_0000_0000_0000 <= value < 0x8000_0000_0000_0000:
+            out += struct.pack(">Bq", 0xD3, value)
+        else:
+            raise TypeError(f"Can't serialize integer {value}, out of range")
+    elif value_type is list or value_type is tuple:
+        _pack_size(len(value), 0x90, 0xDC, out)
+        for item in value:
+            _pack(item, out)
+    elif value_type is float:
+        out += struct.pack(">Bd", 0xCB, value)
+    # subclasses of the types above
+    elif isinstance(value, str):
+        _pack(str(value), out)
+    elif isinstance(value, int):
+        _pack(int(value), out)
+    elif isinstance(value, float):
+        _pack(float(value), out)
+    elif isinstance(value, list | tuple):
+        _pack(list(value), out)
+    elif isinstance(value, dict):
+        _pack(dict(value), out)
+    else:
+        raise TypeError(f"Can't serialize {value_type.__name__} values")
+
+
+def _pack_size(size: int, fix: int, code: int, out: bytearray) -> None:
+    """Append the header of an array or map with size items."""
+    if size < 0x10:
+        out.append(fix | size)
+    elif size < 0x10000:
+        out += struct.pack(">BH", code, size)
+    else:
+        out += struct.pack(">BI", code + 1, size)
+
+
+# struct formats of fixed-size MessagePack values, by type byte
+_FIXED_FORMATS = {
+    code: struct.Struct(value_format)
+    for code, value_format in {
+        0xCA: ">f",
+        0xCB: ">d",
+        0xCC: ">B",
+        0xCD: ">H",
+        0xCE: ">I",
+        0xCF: ">Q",
+        0xD0: ">b",
+        0xD1: ">h",
+        0xD2: ">i",
+        0xD3: ">q",
+    }.items()
+}
+
+# struct formats of the sizes of strings, arrays and maps, by type byte,
+# with the type byte of the short form of the same kind of value
+_SIZE_FORMATS = {
+    0xD9: (struct.Struct(">B"), 0xA0),
+    0xDA: (struct.Struct(">H"), 0xA0),
+    0xDB: (struct.Struct(">I"), 0xA0),
+    0xDC: (struct.Struct(">H"), 0x90),
+    0xDD: (struct.Struct(">I"), 0x90),
+    0xDE: (struct.Struct(">H"), 0x80),
+    0xDF: (struct.Struct(">I"), 0x80),
+}
+
+
+def _unpack(data: bytes, pos: int) -> tuple[Any, int]:
+    """Decode the MessagePack value at pos in data, returning it and the
+    position after it."""
+    code = data[pos]
+    pos += 1
+    if 0xA0 <= code < 0xC0:
+        size, kind = code & 0x1F, 0xA0
+    elif 0x80 <= code < 0xA0:
+        size, kind = code & 0x0F, code & 0xF0
+    elif code < 0x80:
+        return code, pos
+    elif code == 0xC0:
+        return None, pos
+    elif code >= 0xE0:
+        return code - 0x100, pos
+    elif code == 0xC2 or code == 0xC3:
+        return code == 0xC3, pos
+    elif code in _FIXED_FORMATS:
+        value_format = _FIXED_FORMATS[code]
+        return value_format.unpack_from(data, pos)[0], pos + value_format.size
+    elif code in _SIZE_FORMATS:
+        size_format, kind = _SIZE_FORMATS[code]
+        size = size_format.unpack_from(data, pos)[0]
+        pos += size_format.size
+    else:
+        raise ValueError(f"Unsupported MessagePack type {code:#x}")
+
+    if kind == 0xA0:
+        end = pos + size
+        if end > len(data):
+            raise IndexError("Truncated string")
+        return data[pos:end].decode("utf8"), end
+    if kind == 0x90:
+        items = []
+        for _ in range(size):
+            item, pos = _unpack(data, pos)
+            items.append(item)
+        return items, pos
+    mapping = {}
+    for _ in range(size):
+        key, pos = _unpack(data, pos)
+        value, pos = _unpack(data, pos)
+        try:
+            mapping[key] = value
+        except TypeError as e:
+            raise ValueError("Unhashable MessagePack map key") from e
+    return mapping, pos
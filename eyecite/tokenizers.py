@@ -1,5 +1,6 @@
 import hashlib
 import re
+import time
 from collections import defaultdict
 from collections.abc import Generator, Iterable, Sequence
 from copy import deepcopy
@@ -332,9 +333,42 @@ class Tokenizer:
         default_factory=lambda: list(EXTRACTORS)
     )
 
-    def tokenize(self, text: str) -> tuple[Tokens, list[tuple[int, Token]]]:
+    def tokenize(
+        self,
+        text: str,
+        deadline: float | None = None,
+        max_chars: int | None = None,
+    ) -> tuple[Tokens, list[tuple[int, Token]]]:
         """Tokenize text and return list of all tokens, followed by list of
-        just non-string tokens along with their positions in the first list."""
+        just non-string tokens along with their positions in the first list.
+
+        If deadline (a `time.monotonic()` value) is given, stop running
+        extractors once it has passed, and return the tokens found so far.
+        The deadline is checked between extractors, so a single slow
+        extractor regex runs to completion.
+        If max_chars is given, only tokenize the start of the text, up to
+        the last space within max_chars so that words aren't split.
+        """
+        if max_chars is not None and len(text) > max_chars:
+            cut = text.rfind(" ", 0, max_chars + 1)
+            text = text[: cut if cut > 0 else max_chars]
+        return self._tokenize(text, deadline=deadline)
+
+    def tokenize_citations(self, text: str) -> list[Token]:
+        """Return just the non-string tokens that tokenize() would return,
+        in order, without splitting the text between them into words. This
+        is much cheaper than tokenize() for callers that only need the
+        special tokens, such as `eyecite.find.count_citations`."""
+        return self._tokenize(text, with_text=False)[0]  # type: ignore
+
+    def _tokenize(
+        self,
+        text: str,
+        with_text: bool = True,
+        deadline: float | None = None,
+    ) -> tuple[Tokens, list[tuple[int, Token]]]:
+        """Shared implementation of tokenize() and tokenize_citations(). If
+        with_text is False, the text between special tokens is skipped."""
         # Sort all matches by start offset ascending, then end offset
         # descending. Remove overlaps by returning only matches
         # where the current start offset is greater than the previously
@@ -343,7 +377,11 @@ class Tokenizer:
         citation_tokens = []
         all_tokens: Tokens = []
         tokens = sorted(
-            (t for t in self.extract_tokens(text) if t.data is not None),
+            (
+                t
+                for t in self.extract_tokens(text, deadline=deadline)
+                if t.data is not None
+            ),
             key=lambda m: (m.start, -m.end),
         )
         last_token = None
@@ -370,7 +408,7 @@ class Tokenizer:
                 else:
                     # skip overlaps
                     continue
-            if offset < token.start:
+            if with_text and offset < token.start:
                 # capture plain text before each match
                 self.append_text(all_tokens, text[offset : token.start])
             # capture match
@@ -379,7 +417,7 @@ class Tokenizer:
             offset = token.end
             last_token = token
         # capture plain text after final match
-        if offset < len(text):
+        if with_text and offset < len(text):
             self.append_text(all_tokens, text[offset:])
 
         return all_tokens, citation_tokens
@@ -388,9 +426,16 @@ class Tokenizer:
         """Subclasses can override this to filter extractors based on text."""
         return self.extractors
 
-    def extract_tokens(self, text) -> Generator[Token, None, None]:
-        """Get all instances where an extractor matches the given text."""
+    def extract_tokens(
+        self, text, deadline: float | None = None
+    ) -> Generator[Token, None, None]:
+        """Get all instances where an extractor matches the given text. If
+        deadline has passed, skip the remaining extractors. The deadline is
+        only checked before each extractor runs, so one extractor's regex
+        is never interrupted."""
         for extractor in self.get_extractors(text):
+            if deadline is not None and time.monotonic() > deadline:
+                return
             for match in extractor.get_matches(text):
                 yield extractor.get_token(match)
 
@@ -481,8 +526,11 @@ class HyperscanTokenizer(Tokenizer):
     # can be stored.
     cache_dir: str | None = None
 
-    def extract_tokens(self, text) -> Generator[Token, None, None]:
-        """Extract tokens via hyperscan."""
+    def extract_tokens(
+        self, text, deadline: float | None = None
+    ) -> Generator[Token, None, None]:
+        """Extract tokens via hyperscan. If deadline passes, the scan is
+        halted and only the matches found so far are returned."""
         # Get all matches, with byte offsets because hyperscan uses
         # bytes instead of unicode:
         text_bytes = text.encode("utf8")
@@ -490,8 +538,17 @@ class HyperscanTokenizer(Tokenizer):
 
         def on_match(index, start, end, flags, context):
             matches.append((self.extractors[index], (start, end)))
+            # returning True tells hyperscan to stop scanning
+            return deadline is not None and time.monotonic() > deadline
+
+        # import here so the dependency is optional
+        import hyperscan  # pylint: disable=import-outside-toplevel
 
-        self.hyperscan_db.scan(text_bytes, match_event_handler=on_match)
+        try:
+            self.hyperscan_db.scan(text_bytes, match_event_handler=on_match)
+        except hyperscan.ScanTerminated:
+            # on_match halted the scan because the deadline passed
+            pass
 
         # Build a lookup table of byte offset -> str offset for all of the
         # matches we found. Stepping through offsets in sorted order avoids
@@ -516,6 +573,8 @@ class HyperscanTokenizer(Tokenizer):
         # re-run regex against just the matching strings to get match groups
         # (which aren't provided by hyperscan), and tokenize:
         for extractor, (start, end) in matches:
+            if deadline is not None and time.monotonic() > deadline:
+                return
             if start in byte_to_str_offset and end in byte_to_str_offset:
                 start = byte_to_str_offset[start]
                 end = byte_to_str_offset[end]
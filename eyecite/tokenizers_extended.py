@@ -1011,9 +1011,16 @@ class ExtendedCitationTokenizer:
         self.combined_tokenizer.extractors = self.all_extractors
         self.combined_tokenizer.__post_init__()
 
-    def tokenize(self, text: str):
+    def tokenize(
+        self,
+        text: str,
+        deadline: float | None = None,
+        max_chars: int | None = None,
+    ):
         """Tokenize text using combined extractors."""
-        return self.combined_tokenizer.tokenize(text)
+        return self.combined_tokenizer.tokenize(
+            text, deadline=deadline, max_chars=max_chars
+        )
 
     def find_all_citations(self, text: str):
         """Find all citations (both base and extended) in text."""
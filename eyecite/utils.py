@@ -1,6 +1,7 @@
 import hashlib
 import json
 import re
+from bisect import bisect_left, bisect_right
 
 from lxml import etree
 
@@ -158,6 +159,152 @@ def wrap_html_tags(text: str, before: str, after: str):
     return re.sub(r"(<[^>]+>)", rf"{before}\1{after}", text)
 
 
+# XML whitespace, names and quoted attributes, for tags that lxml is known to
+# accept. Names starting with "xml" are reserved, and names with colons need
+# namespaces, so tags using them are left to the parser.
+_XML_SPACE = r"[ \t\r\n]"
+_XML_NAME = r"(?![Xx][Mm][Ll])[A-Za-z_][A-Za-z0-9_.-]*"
+SIMPLE_TAG_REGEX = re.compile(
+    rf"<(?P<close>/)?(?P<name>{_XML_NAME})"
+    rf"(?P<attributes>(?:{_XML_SPACE}+{_XML_NAME}{_XML_SPACE}*="
+    rf"{_XML_SPACE}*(?:\"[^\"<]*\"|'[^'<]*'))*){_XML_SPACE}*"
+    r"(?P<self_closing>/)?>"
+)
+XML_ATTRIBUTE_NAME_REGEX = re.compile(rf"({_XML_NAME}){_XML_SPACE}*=")
+
+# Characters that may make a span invalid XML outside of simple tags, along
+# with any "<" that doesn't start a simple tag and the ">" ending a CDATA
+# section: entities and characters that XML doesn't allow.
+HTML_HAZARD_REGEX = re.compile(
+    r"[&\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]"
+)
+ANGLE_BRACKET_REGEX = re.compile("<")
+
+# literal tags searched for by `maybe_balance_style_tags`
+STYLE_TAGS = ["i", "em", "b"]
+STYLE_TAG_TEXTS = {f"<{tag}>" for tag in STYLE_TAGS} | {
+    f"</{tag}>" for tag in STYLE_TAGS
+}
+
+
+class HtmlTagIndex:
+    """Index of the tags in HTML markup, built in a single pass, used to check
+    whether spans of the markup are balanced and to find nearby style tags
+    without parsing each span:
+
+    >>> index = HtmlTagIndex("<p>foo <i>1 U.S. 1</i> bar</p>")
+    >>> index.is_balanced(7, 22), index.is_balanced(7, 18)
+    (True, False)
+
+    `is_balanced(start, end)` gives the same answer as
+    `is_balanced_html(markup[start:end])`. Simple tags are paired up with a
+    stack, and a span is balanced if every tag in it is paired with another
+    tag in it. Spans containing anything else that could make them invalid
+    XML, such as comments, entities or unquoted attributes, are checked with
+    `is_balanced_html`.
+    """
+
+    def __init__(self, markup: str):
+        self.markup = markup
+        # start and end offsets of each simple tag, and the index of the tag
+        # it's paired with: itself for self-closing tags, len(tag_starts)
+        # for unclosed tags and -1 for unopened ones
+        self.tag_starts: list[int] = []
+        self.tag_ends: list[int] = []
+        self.partners: list[int] = []
+        # offsets of characters that need the parser to check
+        self.hazards: list[int] = []
+        # offsets of each literal style tag, like "<i>" or "</i>"
+        self.style_tags: dict[str, list[int]] = {}
+
+        tag_starts = self.tag_starts
+        tag_ends = self.tag_ends
+        partners = self.partners
+        hazards = self.hazards
+        open_tags: list[tuple[str, int]] = []
+        for index, tag in enumerate(SIMPLE_TAG_REGEX.finditer(markup)):
+            start, end = tag.span()
+            tag_starts.append(start)
+            tag_ends.append(end)
+            close, name, attributes, self_closing = tag.group(
+                "close", "name", "attributes", "self_closing"
+            )
+            if attributes:
+                attribute_names = XML_ATTRIBUTE_NAME_REGEX.findall(attributes)
+                if close or len(set(attribute_names)) < len(attribute_names):
+                    # duplicate attributes are invalid XML, as are closing
+                    # tags with attributes
+                    hazards.append(start)
+            if close:
+                if self_closing:
+                    hazards.append(start)
+                if open_tags and open_tags[-1][0] == name:
+                    _, open_index = open_tags.pop()
+                    partners[open_index] = index
+                    partners.append(open_index)
+                else:
+                    partners.append(-1)
+            elif self_closing:
+                partners.append(index)
+            else:
+                open_tags.append((name, index))
+                partners.append(-1)
+            if end - start <= 5 and markup[start:end] in STYLE_TAG_TEXTS:
+                self.style_tags.setdefault(markup[start:end], []).append(start)
+        for _, open_index in open_tags:
+            partners[open_index] = len(tag_starts)
+
+        tag_start_set = set(tag_starts)
+        hazards.extend(
+            match.start()
+            for match in ANGLE_BRACKET_REGEX.finditer(markup)
+            if match.start() not in tag_start_set
+        )
+        hazards.extend(
+            match.start() for match in HTML_HAZARD_REGEX.finditer(markup)
+        )
+        cdata_end = markup.find("]]>")
+        while cdata_end >= 0:
+            hazards.append(cdata_end + 2)
+            cdata_end = markup.find("]]>", cdata_end + 1)
+        hazards.sort()
+
+    def is_balanced(self, start: int, end: int) -> bool:
+        """Return False if markup[start:end] contains un-balanced HTML,
+        otherwise True."""
+        if start >= end:
+            return True
+        hazard = bisect_left(self.hazards, start)
+        if hazard < len(self.hazards) and self.hazards[hazard] < end:
+            return is_balanced_html(self.markup[start:end])
+        first = bisect_left(self.tag_starts, start)
+        last = bisect_left(self.tag_starts, end)
+        if last > first and self.tag_ends[last - 1] > end:
+            # a tag is cut off by the end of the span
+            return False
+        return all(
+            first <= partner < last for partner in self.partners[first:last]
+        )
+
+    def find(self, tag: str, start: int, end: int) -> int:
+        """Return the offset of the first occurrence of the literal style tag
+        within markup[start:end], or -1."""
+        offsets = self.style_tags.get(tag, [])
+        i = bisect_left(offsets, start)
+        if i < len(offsets) and offsets[i] + len(tag) <= end:
+            return offsets[i]
+        return -1
+
+    def rfind(self, tag: str, start: int, end: int) -> int:
+        """Return the offset of the last occurrence of the literal style tag
+        within markup[start:end], or -1."""
+        offsets = self.style_tags.get(tag, [])
+        i = bisect_right(offsets, end - len(tag)) - 1
+        if i >= 0 and offsets[i] >= start:
+            return offsets[i]
+        return -1
+
+
 def hyperscan_match(regexes, text):
     """Run regexes on text using hyperscan, for debugging."""
     # import here so the dependency is optional
@@ -254,7 +401,11 @@ def is_valid_name(name: str) -> bool:
 
 
 def maybe_balance_style_tags(
-    start: int, end: int, plain_text: str, tolerance: int = 10
+    start: int,
+    end: int,
+    plain_text: str,
+    tolerance: int = 10,
+    tag_index: HtmlTagIndex | None = None,
 ) -> tuple[int, int, str]:
     """Try to include missing style tags in the proximity of the found span
 
@@ -272,12 +423,18 @@ def maybe_balance_style_tags(
     :param end: the origina end of the span
     :param plain_text: the text to annotate
     :param tolerance: tolerate at most this amount of extra characters
+    :param tag_index: if provided, a HtmlTagIndex of plain_text, used to
+        find the tags without searching the text
     :return: a tuple (new start, new end, new span text)
     """
+    if tag_index is not None:
+        return _balance_style_tags_with_index(
+            start, end, plain_text, tolerance, tag_index
+        )
+
     span_text = plain_text[start:end]
-    style_tags = ["i", "em", "b"]
 
-    for tag in style_tags:
+    for tag in STYLE_TAGS:
         opening_tag = f"<{tag}>"
         closing_tag = f"</{tag}>"
         has_opening = opening_tag in span_text
@@ -317,6 +474,39 @@ def maybe_balance_style_tags(
     return start, end, plain_text[start:end]
 
 
+def _balance_style_tags_with_index(
+    start: int,
+    end: int,
+    plain_text: str,
+    tolerance: int,
+    tag_index: HtmlTagIndex,
+) -> tuple[int, int, str]:
+    """Same as maybe_balance_style_tags, looking up tags in tag_index."""
+    span_start, span_end = start, end
+    for tag in STYLE_TAGS:
+        opening_tag = f"<{tag}>"
+        closing_tag = f"</{tag}>"
+        has_opening = tag_index.find(opening_tag, span_start, span_end) >= 0
+        has_closing = tag_index.find(closing_tag, span_start, span_end) >= 0
+        if has_opening and not has_closing:
+            # pick the first closing tag within tolerance
+            extended_end = min(
+                end + len(closing_tag) + tolerance, len(plain_text)
+            )
+            offset = tag_index.find(closing_tag, start, extended_end)
+            if offset >= 0:
+                end = offset + len(closing_tag)
+
+        if not has_opening and has_closing:
+            # pick the last opening tag within tolerance
+            extended_start = max(start - len(opening_tag) - tolerance, 0)
+            offset = tag_index.rfind(opening_tag, extended_start, end)
+            if offset >= 0:
+                start = offset
+
+    return start, end, plain_text[start:end]
+
+
 def placeholder_markup(html: str) -> str:
     """Create placeholder HTML to identify annotation locations.
 
@@ -1,10 +1,22 @@
 import re
+from bisect import bisect_left, bisect_right
 from pathlib import Path
 from unittest import TestCase
 
-from eyecite import annotate_citations, clean_text, get_citations
+from eyecite import (
+    annotate_citations,
+    annotate_document,
+    clean_text,
+    get_citations,
+    iter_annotated_text,
+)
+from eyecite.annotate import SpanUpdater
 from eyecite.models import Document
-from eyecite.utils import maybe_balance_style_tags
+from eyecite.utils import (
+    HtmlTagIndex,
+    is_balanced_html,
+    maybe_balance_style_tags,
+)
 
 
 class AnnotateTest(TestCase):
@@ -260,6 +272,19 @@ class AnnotateTest(TestCase):
                 )
                 self.assertEqual(annotated, expected)
 
+                if annotate_kwargs.get("unbalanced_tags", "unchecked") != (
+                    "unchecked"
+                ):
+                    # checking tags with an index gives the same result
+                    annotated = annotate_citations(
+                        document.plain_text,
+                        annotations,
+                        source_text=source_text,
+                        tag_index=HtmlTagIndex(source_text),
+                        **annotate_kwargs,
+                    )
+                    self.assertEqual(annotated, expected)
+
     def test_tag_balancing(self):
         """Test trickier tag balancing cases"""
         pairs = [
@@ -293,6 +318,107 @@ class AnnotateTest(TestCase):
             _, _, balanced = maybe_balance_style_tags(start, end, full_string)
             self.assertEqual(balanced, expected_balanced)
 
+    def test_annotate_document(self):
+        """Annotating a document should match annotate_citations, reusing
+        the document's offset map or rebuilding it once."""
+        for kwargs in [
+            {
+                "markup_text": "<p>foo <i>1 U.S. 1</i>, 2 U.S. 2</p>",
+                "clean_steps": ["html", "all_whitespace"],
+            },
+            {
+                "plain_text": "foo  1 U.S.\n1, __ 2 U.S. 2",
+                "clean_steps": ["underscores", "all_whitespace"],
+            },
+            {"plain_text": "foo 1 U.S. 1, 2 U.S. 2"},
+        ]:
+            with self.subTest(**kwargs):
+                citations = get_citations(**kwargs)
+                document = citations[0].document
+                source_text = kwargs.get("markup_text") or kwargs.get(
+                    "plain_text"
+                )
+                annotations = [(c.span(), "<a>", "</a>") for c in citations]
+                expected = annotate_citations(
+                    document.plain_text, annotations, source_text
+                )
+                self.assertEqual(
+                    annotate_document(document, annotations), expected
+                )
+                if document.markup_text:
+                    plain_to_markup = document.plain_to_markup
+                    annotate_document(document, annotations)
+                    self.assertIs(document.plain_to_markup, plain_to_markup)
+                    # a missing offset map is rebuilt
+                    document.plain_to_markup = None
+                    self.assertEqual(
+                        annotate_document(document, annotations), expected
+                    )
+                    self.assertIsNotNone(document.plain_to_markup)
+
+    def test_iter_annotated_text(self):
+        """Streamed chunks should join to the annotated text, consuming
+        presorted annotations lazily."""
+        source_text = "<p>foo <i>1 U.S. 1</i>, 2 U.S. 2 and 3 U.S. 3</p>"
+        citations = get_citations(
+            markup_text=source_text, clean_steps=["html"]
+        )
+        document = citations[0].document
+        annotations = [(c.span(), "<a>", "</a>") for c in citations]
+        for kwargs in [
+            {},
+            {"unbalanced_tags": "skip"},
+            {"unbalanced_tags": "wrap"},
+            {"offset_updater": document.plain_to_markup},
+        ]:
+            with self.subTest(**kwargs):
+                expected = annotate_citations(
+                    document.plain_text,
+                    annotations[::-1],
+                    source_text=source_text,
+                    **kwargs,
+                )
+                consumed = []
+
+                def presorted_annotations(consumed):
+                    for annotation in annotations:
+                        consumed.append(annotation)
+                        yield annotation
+
+                chunks = iter_annotated_text(
+                    document.plain_text,
+                    presorted_annotations(consumed),
+                    source_text=source_text,
+                    presorted=True,
+                    **kwargs,
+                )
+                self.assertEqual(next(chunks), "<p>foo <i>")
+                self.assertEqual(consumed, annotations[:1])
+                self.assertEqual("<p>foo <i>" + "".join(chunks), expected)
+
+    def test_html_tag_index(self):
+        """The tag index should agree with is_balanced_html and
+        maybe_balance_style_tags for every span of the markup."""
+        markup = (
+            "<p class='x'>A <i>v.</i> B<br/>, <em>1 U.S.</em> 1 &amp; "
+            "<b>c<!-- <i> --></b> <a href=x>d</a> <span a='1' a='2'>e"
+            "</span></i> <I>f</i> ]]> g</p>"
+        )
+        tag_index = HtmlTagIndex(markup)
+        for start in range(len(markup) + 1):
+            for end in range(start, len(markup) + 1):
+                self.assertEqual(
+                    tag_index.is_balanced(start, end),
+                    is_balanced_html(markup[start:end]),
+                    markup[start:end],
+                )
+                self.assertEqual(
+                    maybe_balance_style_tags(
+                        start, end, markup, tag_index=tag_index
+                    ),
+                    maybe_balance_style_tags(start, end, markup),
+                )
+
     def test_long_diff(self):
         """Does diffing work across a long text with many changes?"""
         opinion_text = (
@@ -303,6 +429,78 @@ class AnnotateTest(TestCase):
             cleaned_text, [((902, 915), "~FOO~", "~BAR~")], opinion_text
         )
         self.assertIn("~FOO~539\n  U. S. 306~BAR~", annotated_text)
+        # tracking the clean steps should find the same offsets
+        self.assertEqual(
+            annotate_citations(
+                cleaned_text,
+                [((902, 915), "~FOO~", "~BAR~")],
+                opinion_text,
+                clean_steps=["all_whitespace"],
+            ),
+            annotated_text,
+        )
+
+    def test_span_updater_serialization(self):
+        """A loaded SpanUpdater should translate offsets like the original,
+        and invalid data should be rejected."""
+        text_before = "foo bar <b>baz</b> qux"
+        text_after = "foo x bar baz quux"
+        updater = SpanUpdater(text_before, text_after)
+        loaded = SpanUpdater.from_bytes(updater.to_bytes())
+        self.assertEqual(
+            (loaded.offsets, loaded.deltas, loaded.kinds),
+            (updater.offsets, updater.deltas, updater.kinds),
+        )
+        offsets = range(len(text_before) + 1)
+        for bisect in [bisect_left, bisect_right]:
+            self.assertEqual(
+                loaded.update_many(offsets, bisect),
+                updater.update_many(offsets, bisect),
+            )
+        for data in [b"", b"JUNK" + updater.to_bytes()[4:], b"ESU1\x05\0\0\0"]:
+            with self.assertRaises(ValueError):
+                SpanUpdater.from_bytes(data)
+
+    def test_update_many(self):
+        """Translating offsets in bulk should match translating them one at
+        a time, including offsets inside deleted ranges."""
+        text_before = "foo bar <b>baz</b> qux"
+        text_after = "foo x bar baz quux"
+        offsets = list(range(len(text_before) + 1))
+        shuffled = offsets[1::2] + offsets[::2]
+        for use_dmp in [True, False]:
+            updater = SpanUpdater(text_before, text_after, use_dmp=use_dmp)
+            for bisect in [bisect_left, bisect_right]:
+                with self.subTest(use_dmp=use_dmp, bisect=bisect.__name__):
+                    self.assertEqual(
+                        updater.update_many(shuffled, bisect),
+                        [
+                            updater.update(offset, bisect)
+                            for offset in shuffled
+                        ],
+                    )
+        self.assertEqual(updater.update_many([]), [])
+
+    def test_span_updater_pair(self):
+        """Both directions should come from one diff, and offsets outside
+        changed ranges should round trip."""
+        text_before = "foo bar baz qux"
+        text_after = "<p>foo <i>bar</i> baz</p> qux"
+        forward, backward = SpanUpdater.pair(text_before, text_after)
+        expected_forward = SpanUpdater(text_before, text_after)
+        self.assertEqual(forward.offsets, expected_forward.offsets)
+        self.assertEqual(forward.deltas, expected_forward.deltas)
+        self.assertEqual(forward.kinds, expected_forward.kinds)
+        for offset in range(len(text_before) + 1):
+            self.assertEqual(
+                backward.update(
+                    forward.update(offset, bisect_right), bisect_right
+                ),
+                offset,
+            )
+        self.assertEqual(
+            backward.update(text_after.index("</p>"), bisect_left), 11
+        )
 
     def test_span_with_pincite(self):
         test_pairs = [
@@ -0,0 +1,185 @@
+from functools import partial
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from eyecite import get_citations
+from eyecite.cache import (
+    CacheBackend,
+    DirectoryCache,
+    MemoryCache,
+    SQLiteCache,
+    cache_key,
+)
+from eyecite.models import Document
+from eyecite.tokenizers import Tokenizer, default_tokenizer
+
+
+def summarize(citations):
+    """Reduce citations to comparable values, since some citation types are
+    only equal to themselves."""
+    return [
+        (
+            type(c).__name__,
+            c.span(),
+            c.full_span(),
+            c.matched_text(),
+            c.corrected_citation(),
+            c.groups,
+            c.metadata,
+        )
+        for c in citations
+    ]
+
+
+class CacheTest(TestCase):
+    text = (Path(__file__).parent / "assets" / "opinion.txt").read_text()
+
+    def assertCacheRoundTrip(self, cache, **kwargs):
+        expected = get_citations(cache=cache, **kwargs)
+        with patch.object(Document, "tokenize") as tokenize:
+            cached = get_citations(cache=cache, **kwargs)
+        tokenize.assert_not_called()
+        self.assertEqual(summarize(cached), summarize(expected))
+        self.assertEqual(
+            summarize(expected), summarize(get_citations(**kwargs))
+        )
+        self.assertIs(cached[0].document, cached[-1].document)
+        self.assertEqual(
+            cached[0].document.plain_text, expected[0].document.plain_text
+        )
+
+    def test_memory_cache(self):
+        self.assertCacheRoundTrip(MemoryCache(), plain_text=self.text)
+
+    def test_sqlite_cache(self):
+        with TemporaryDirectory() as tmp_dir:
+            cache = SQLiteCache(Path(tmp_dir) / "cache.sqlite")
+            self.assertCacheRoundTrip(cache, plain_text=self.text)
+            cache.close()
+
+    def test_directory_cache(self):
+        with TemporaryDirectory() as tmp_dir:
+            self.assertCacheRoundTrip(
+                DirectoryCache(tmp_dir), plain_text=self.text
+            )
+
+    def test_markup_cache(self):
+        markup_text = (
+            "<p><i>Foo v. Bar</i>, 1 U.S. 1 (1999). "
+            "<i>Foo</i> held something. <i>Id.</i> at 2.</p>"
+        )
+        cache = MemoryCache()
+        self.assertCacheRoundTrip(
+            cache,
+            markup_text=markup_text,
+            clean_steps=["html", "inline_whitespace"],
+        )
+        cached = get_citations(
+            markup_text=markup_text,
+            clean_steps=["html", "inline_whitespace"],
+            cache=cache,
+        )
+        self.assertEqual(cached[0].document.source_text, markup_text)
+        # the offset maps are restored, so annotating doesn't diff again
+        document = cached[0].document
+        self.assertEqual(
+            document.plain_to_markup.update_many(range(20)),
+            get_citations(
+                markup_text=markup_text,
+                clean_steps=["html", "inline_whitespace"],
+            )[0].document.plain_to_markup.update_many(range(20)),
+        )
+        self.assertIsNotNone(document.markup_to_plain)
+
+    def test_cache_key(self):
+        """Any argument that affects the result should change the key."""
+        base_args = ("1 U.S. 1", "", False, default_tokenizer, None)
+        base_key = cache_key(*base_args)
+        self.assertEqual(base_key, cache_key(*base_args))
+        for i, value in enumerate(
+            ["2 U.S. 2", "<p>1 U.S. 1</p>", True, Tokenizer([]), ["html"]]
+        ):
+            args = list(base_args)
+            args[i] = value
+            self.assertNotEqual(base_key, cache_key(*args))
+
+    def test_cache_key_clean_steps(self):
+        """Are only clean steps that can be told apart by name cached?"""
+        self.assertIsNotNone(
+            cache_key("1 U.S. 1", "", False, default_tokenizer, [summarize])
+        )
+        for step in [
+            lambda text: text,
+            partial(str.replace, old="a", new="b"),
+            str.strip,
+        ]:
+            with self.subTest(step=step):
+                self.assertIsNone(
+                    cache_key("1 U.S. 1", "", False, default_tokenizer, [step])
+                )
+
+        cache = MemoryCache()
+        for text in ["1 U.S. 1", "1 U.S. 1. 2 U.S. 2"]:
+            citations = get_citations(
+                "placeholder",
+                clean_steps=[lambda _, text=text: text],
+                cache=cache,
+            )
+            self.assertEqual(len(citations), text.count("U.S."))
+        self.assertEqual(len(cache), 0)
+
+    def test_cache_key_tokenizer_extractors(self):
+        """Does changing a tokenizer's extractors change the key?"""
+        tokenizer = Tokenizer(list(default_tokenizer.extractors))
+        args = ("1 U.S. 1", "", False, tokenizer, None)
+        key = cache_key(*args)
+        self.assertEqual(key, cache_key(*args))
+        tokenizer.extractors = tokenizer.extractors[1:]
+        self.assertNotEqual(key, cache_key(*args))
+
+    def test_limits_bypass_cache(self):
+        """Are calls with a deadline or max_chars neither served from nor
+        stored in the cache?"""
+        text = "1 U.S. 1. Foo. 2 U.S. 2. Bar. 3 U.S. 3."
+        cache = MemoryCache()
+        get_citations(text, cache=cache)
+        self.assertEqual(len(cache), 1)
+
+        truncated = []
+        with self.assertLogs("eyecite.find", "WARNING"):
+            citations = get_citations(
+                text, cache=cache, max_chars=22, on_truncated=truncated.append
+            )
+        self.assertEqual(len(citations), 1)
+        self.assertTrue(citations[0].document.truncated)
+        self.assertEqual(truncated, [citations])
+
+        cache = MemoryCache()
+        get_citations(text, cache=cache, max_chars=len(text))
+        self.assertEqual(len(cache), 0)
+
+    def test_incomplete_backend(self):
+        """Do backends missing get() or set() fail when instantiated?"""
+
+        class GetOnly(CacheBackend):
+            def get(self, key):
+                return None
+
+        with self.assertRaises(TypeError):
+            GetOnly()  # type: ignore[abstract]
+
+    def test_memory_cache_eviction(self):
+        cache = MemoryCache(max_size=10)
+        cache.set("a", b"1234")
+        cache.set("b", b"1234")
+        cache.get("a")
+        cache.set("c", b"1234")
+        self.assertEqual(cache.get("b"), None)
+        self.assertEqual(cache.get("a"), b"1234")
+        self.assertEqual(cache.get("c"), b"1234")
+        self.assertEqual(cache.size, 8)
+        cache.set("d", b"12345678901")
+        self.assertEqual(cache.get("d"), None)
+        self.assertEqual(len(cache), 2)
@@ -0,0 +1,141 @@
+from importlib.util import find_spec
+from unittest import TestCase, skipUnless
+
+from eyecite import get_citations
+from eyecite.columnar import (
+    COLUMNS,
+    NULL,
+    citations_to_columns,
+    documents_to_columns,
+)
+from eyecite.models import Token
+from eyecite.models_extended import JournalArticleCitation
+from eyecite.tokenizers_extended import default_extended_tokenizer
+
+
+class ColumnarTest(TestCase):
+    texts = {
+        "a": "Foo v. Bar, 1 U.S. 1, 2 (1999). Foo, 1 U.S. at 5. Id. at 3.",
+        "b": "Mass. Gen. Laws ch. 1, § 2. 1 Minn. L. Rev. 1. See § 4.",
+        "c": "No citations.",
+    }
+
+    def test_documents_to_columns(self):
+        """Do the columns hold the values of each citation?"""
+        batch = [
+            (key, get_citations(text)) for key, text in self.texts.items()
+        ]
+        columns = documents_to_columns(batch).to_pydict()
+        self.assertEqual(list(columns), list(COLUMNS))
+
+        rows = [dict(zip(columns, row)) for row in zip(*columns.values())]
+        citations = [
+            (key, citation)
+            for key, citations in batch
+            for citation in citations
+        ]
+        self.assertEqual(len(rows), len(citations))
+        for row, (key, citation) in zip(rows, citations):
+            with self.subTest(citation=citation):
+                self.assertEqual(row["document"], key)
+                self.assertEqual(row["type"], type(citation).__name__)
+                self.assertEqual(
+                    (row["span_start"], row["span_end"]), citation.span()
+                )
+                self.assertEqual(
+                    (row["full_span_start"], row["full_span_end"]),
+                    citation.full_span(),
+                )
+                self.assertEqual(row["volume"], citation.groups.get("volume"))
+                self.assertEqual(row["pin_cite"], citation.metadata.pin_cite)
+
+        self.assertEqual(
+            rows[0],
+            {
+                "document": "a",
+                "type": "FullCaseCitation",
+                "span_start": 12,
+                "span_end": 20,
+                "full_span_start": 0,
+                "full_span_end": 30,
+                "volume": "1",
+                "reporter": "U.S.",
+                "page": "1",
+                "year": 1999,
+                "court": "scotus",
+                "pin_cite": "2",
+            },
+        )
+        self.assertEqual(rows[2]["type"], "IdCitation")
+        self.assertEqual(rows[2]["reporter"], None)
+        self.assertEqual(rows[2]["year"], None)
+
+    def test_dictionary_encoding(self):
+        """Are repeated strings stored once, with missing values as NULL?"""
+        citations = get_citations("1 U.S. 1. 2 U.S. 2. Id.")
+        columns = citations_to_columns(citations)
+        self.assertEqual(len(columns), 3)
+        self.assertEqual(columns.document_ids, [None])
+        self.assertEqual(columns.dictionaries["reporter"], ["U.S."])
+        self.assertEqual(list(columns.columns["reporter"]), [0, 0, NULL])
+        self.assertEqual(list(columns.columns["year"]), [NULL] * 3)
+
+    def test_extended_citations(self):
+        """Are extended citations exported, with year strings as integers
+        where they are numeric?"""
+        citations = get_citations(
+            "See U.S. Const. art. I, § 8; 42 C.F.R. § 482.12; "
+            "doi:10.1000/182.",
+            tokenizer=default_extended_tokenizer,
+        )
+        citations += [
+            JournalArticleCitation(
+                Token("1 Harv. L. Rev. 1", 0, 17),
+                0,
+                volume="1",
+                reporter="Harv. L. Rev.",
+                page="1",
+                year=year,
+            )
+            for year in ["1999", "", "n.d.", "²", "1" * 20]
+        ]
+        columns = citations_to_columns(citations).to_pydict()
+        self.assertEqual(
+            columns["type"], [type(c).__name__ for c in citations]
+        )
+        self.assertEqual(columns["year"][-5:], [1999] + [None] * 4)
+
+    def test_full_span(self):
+        """Do the full span columns come from full_span(), including for
+        citations that override it?"""
+        citation, id_citation = get_citations("Foo v. Bar, 1 U.S. 1. Id.")
+
+        class Overridden(type(id_citation)):  # type: ignore[misc]
+            def full_span(self):
+                return 1, self.span()[1]
+
+        id_citation.__class__ = Overridden
+        columns = citations_to_columns([citation, id_citation]).to_pydict()
+        self.assertEqual(
+            list(zip(columns["full_span_start"], columns["full_span_end"])),
+            [citation.full_span(), (1, id_citation.span()[1])],
+        )
+
+    @skipUnless(find_spec("numpy"), "numpy is not installed")
+    def test_to_numpy(self):
+        """Do numpy arrays share memory with the columns?"""
+        columns = citations_to_columns(get_citations("1 U.S. 1. Id."))
+        arrays = columns.to_numpy()
+        self.assertEqual(arrays["span_end"].tolist(), [8, 13])
+        self.assertEqual(arrays["reporter"].tolist(), [0, NULL])
+        columns.columns["span_end"][0] = 9
+        self.assertEqual(arrays["span_end"][0], 9)
+
+    @skipUnless(find_spec("pyarrow"), "pyarrow is not installed")
+    def test_to_arrow(self):
+        """Does the arrow table hold the same values as the columns?"""
+        columns = citations_to_columns(get_citations("1 U.S. 1. Id."))
+        table = columns.to_arrow()
+        expected = columns.to_pydict()
+        expected["document"] = [0, 0]
+        self.assertEqual(table.to_pydict(), expected)
@@ -0,0 +1,81 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from eyecite import get_citations, resolve_citations
+from eyecite.corpus import CorpusIndex, CorpusResource, citation_key
+from eyecite.models import Resource
+
+
+class CorpusTest(TestCase):
+    def setUp(self):
+        tmp_dir = TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = Path(tmp_dir.name) / "corpus.sqlite"
+        self.index = CorpusIndex(self.path)
+        self.addCleanup(self.index.close)
+
+    def test_citation_key(self):
+        full, short, law = get_citations(
+            "Foo v. Bar, 1 U. S. 1 (1999). Foo, 1 U.S., at 2. "
+            "Mass. Gen. Laws ch. 1, § 2."
+        )
+        self.assertEqual(citation_key(full), ("1", "U.S.", "1"))
+        self.assertEqual(citation_key(short), None)
+        self.assertEqual(citation_key(law), None)
+        (missing_page,) = get_citations("1 U.S. ___")
+        self.assertEqual(citation_key(missing_page), None)
+
+    def test_lookup(self):
+        self.index.bulk_load(
+            [("1", "U.S.", "1", 101), ("2", "S. Ct.", "3", "abc")]
+        )
+        self.assertEqual(len(self.index), 2)
+        self.assertEqual(
+            self.index.lookup_many(
+                [("1", "U.S.", "1"), ("2", "S. Ct.", "3"), ("9", "U.S.", "9")]
+            ),
+            {("1", "U.S.", "1"): 101, ("2", "S. Ct.", "3"): "abc"},
+        )
+        # rows are replaced, and persisted
+        self.index.bulk_load([("1", "U.S.", "1", 102)])
+        self.index.close()
+        self.index = CorpusIndex(self.path)
+        (citation,) = get_citations("1 U. S. 1")
+        self.assertEqual(self.index.lookup(citation), 102)
+
+    def test_lookup_many_chunks(self):
+        self.index.bulk_load(
+            (str(volume), "U.S.", "1", volume) for volume in range(1000)
+        )
+        keys = [(str(volume), "U.S.", "1") for volume in range(0, 2000, 2)]
+        found = self.index.lookup_many(keys)
+        self.assertEqual(len(found), 500)
+        self.assertEqual(found["998", "U.S.", "1"], 998)
+
+    def test_resolver(self):
+        self.index.add_citations(
+            (citation, 7) for citation in get_citations("1 U.S. 1, 2 S. Ct. 3")
+        )
+        citations = get_citations(
+            "Foo v. Bar, 1 U.S. 1. Foo v. Bar, 2 S. Ct. 3, 5. Id. at 6. "
+            "Baz v. Qux, 4 F.3d 5. Foo, 1 U.S., at 2."
+        )
+        resolutions = resolve_citations(
+            citations, resolve_full_citation=self.index.resolver(citations)
+        )
+        self.assertEqual(
+            {
+                resource: [c.matched_text() for c in resolved]
+                for resource, resolved in resolutions.items()
+            },
+            {
+                CorpusResource(7): [
+                    "1 U.S. 1",
+                    "2 S. Ct. 3",
+                    "Id.",
+                    "1 U.S., at 2",
+                ],
+                Resource(citations[3]): ["4 F.3d 5"],
+            },
+        )
@@ -1,6 +1,10 @@
+import re
 from unittest import TestCase
 
+from courts_db import courts
+
 from eyecite import get_citations
+from eyecite.helpers import get_court_by_paren
 
 
 class RegexesTest(TestCase):
@@ -40,3 +44,36 @@ class RegexesTest(TestCase):
         for key in samples:
             eyecite_result = get_citations(key)
             self.assertEqual(eyecite_result[0].metadata.court, samples[key])
+
+    def test_court_paren_index(self):
+        """Does the court lookup index give the same results as scanning
+        every court?"""
+
+        normalized_courts = [
+            (re.sub(r"[^\w]", "", court["citation_string"]).lower(), court)
+            for court in courts
+        ]
+
+        def scan_courts(paren_string):
+            court_str = re.sub(r"[^\w]", "", paren_string).lower()
+            court_code = None
+            if court_str:
+                for s, court in normalized_courts:
+                    if s == court_str:
+                        return str(court["id"])
+                    if s.startswith(court_str):
+                        court_code = court["id"]
+            return court_code
+
+        samples = {"", "()", "2d Cir", "Tex. Crim.", "Zzz", "N.", "S.D.N.Y."}
+        for court in courts:
+            citation_string = court["citation_string"]
+            samples.update(
+                [citation_string, citation_string[:3], citation_string[:-1]]
+            )
+        for paren_string in samples:
+            self.assertEqual(
+                get_court_by_paren(paren_string),
+                scan_courts(paren_string),
+                paren_string,
+            )
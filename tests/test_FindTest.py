@@ -1,12 +1,20 @@
+import gc
 import os
+import time
+import weakref
+from collections import Counter
 from copy import copy
 from datetime import datetime
+from itertools import product
+from pathlib import Path
 from unittest import TestCase
 from unittest.mock import patch
 
 from eyecite import get_citations
-from eyecite.find import extract_reference_citations
-from eyecite.helpers import filter_citations
+from eyecite.annotate import annotate_document
+from eyecite.cache import MemoryCache
+from eyecite.find import count_citations, extract_reference_citations
+from eyecite.helpers import filter_citations, match_on_tokens
 
 # by default tests use a cache for speed
 # call tests with `EYECITE_CACHE_DIR= python ...` to disable cache
@@ -1293,6 +1301,42 @@ class FindTest(TestCase):
                 any(isinstance(cite, ReferenceCitation) for cite in citations)
             )
 
+    def test_markup_full_spans(self):
+        """Pin the full spans of citations whose case names are in emphasis
+        tags. The tags start inside ranges changed by cleaning, so where
+        they map to in the plain text depends on how the diff aligns the
+        whitespace around them."""
+        test_pairs = (
+            (
+                "<html><body><p>x  <i>Roe</i>, 10 F. at 7</p></body></html>",
+                [(4, 20)],
+            ),
+            (
+                "<p>x  <i>Roe</i>, 10 F. at 7 "
+                "<i>Wade v. Foo Corp.</i>, 2 F.2d 3 (1999)</p>",
+                [(3, 20), (22, 57)],
+            ),
+        )
+        for markup_text, full_spans in test_pairs:
+            with self.subTest(markup_text=markup_text):
+                citations = get_citations(
+                    markup_text=markup_text, clean_steps=["html"]
+                )
+                self.assertEqual(
+                    [c.full_span() for c in citations], full_spans
+                )
+                self.assertEqual(
+                    annotate_document(
+                        citations[0].document,
+                        [(c.full_span(), "<a>", "</a>") for c in citations],
+                        unbalanced_tags="skip",
+                    ),
+                    markup_text.replace("<i>", "<a><i>", 1)
+                    .replace(" <i>Wade", " <a><i>Wade")
+                    .replace(", 10 F. at 7", ", 10 F. at 7</a>")
+                    .replace("(1999)", "(1999)</a>"),
+                )
+
     def test_markup_plaintiff_and_antecedent_guesses(self) -> None:
         # Can we identify full case names in markup text
         test_pairs = (
@@ -1962,3 +2006,147 @@ class FindTest(TestCase):
         citations = get_citations(text)
         self.assertEqual(len(citations), 2)
         mock_warn.assert_not_called()
+
+    def test_count_citations(self):
+        """Does count_citations agree with the citations that
+        get_citations finds?"""
+        self.assertEqual(
+            count_citations("1 U.S. 1; 2 U.S. 2. 3 F.2d 3; 2 U.S., at 4"),
+            Counter({("U.S.", "U.S."): 3, ("F.", "F.2d"): 1}),
+        )
+        self.assertEqual(count_citations("no citations here"), Counter())
+
+        path = Path(__file__).parent / "assets" / "opinion.txt"
+        text = path.read_text()
+        expected = sum(
+            isinstance(c, ResourceCitation) for c in get_citations(text)
+        )
+        self.assertEqual(sum(count_citations(text).values()), expected)
+
+    def test_limits(self):
+        """Do deadline and max_chars return partial results, flagged as
+        truncated?"""
+        text = "1 U.S. 1. Foo. 2 U.S. 2. Bar. 3 U.S. 3."
+        for tokenizer in tested_tokenizers:
+            with self.subTest(tokenizer=type(tokenizer).__name__):
+                citations = get_citations(text, tokenizer=tokenizer)
+                self.assertEqual(len(citations), 3)
+                self.assertFalse(citations[0].document.truncated)
+
+                with self.assertLogs("eyecite.find", "WARNING"):
+                    citations = get_citations(
+                        text, tokenizer=tokenizer, max_chars=22
+                    )
+                self.assertEqual(
+                    [c.matched_text() for c in citations], ["1 U.S. 1"]
+                )
+                self.assertTrue(citations[0].document.truncated)
+
+                truncated = []
+                with self.assertLogs("eyecite.find", "WARNING"):
+                    citations = get_citations(
+                        text,
+                        tokenizer=tokenizer,
+                        deadline=0,
+                        on_truncated=truncated.append,
+                    )
+                self.assertEqual(citations, [])
+                self.assertEqual(truncated, [[]])
+                self.assertIs(truncated[0], citations)
+
+                citations = get_citations(
+                    text,
+                    tokenizer=tokenizer,
+                    deadline=time.monotonic() + 60,
+                    max_chars=len(text),
+                    on_truncated=truncated.append,
+                )
+                self.assertEqual(len(citations), 3)
+                self.assertFalse(citations[0].document.truncated)
+                self.assertEqual(len(truncated), 1)
+
+    def test_detach(self):
+        """Do detached citations answer from their own state without keeping
+        the Document alive?"""
+        text = "Foo v. Bar, 1 U.S. 1, 2 (1999). Foo, 1 U.S. at 4. Id. at 3."
+        documents = []
+
+        class TrackedDocument(Document):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                documents.append(weakref.ref(self))
+
+        expected = get_citations(text)
+        with patch("eyecite.find.Document", TrackedDocument):
+            citations = get_citations(text, detach=True)
+        gc.collect()
+        self.assertIsNone(documents[0]())
+
+        self.assertEqual(len(citations), len(expected))
+        for citation, expected_citation in zip(citations, expected):
+            self.assertIsNone(citation.document)
+            self.assertEqual(repr(citation), repr(expected_citation))
+            self.assertEqual(
+                citation.matched_text(), expected_citation.matched_text()
+            )
+            self.assertEqual(citation.span(), expected_citation.span())
+            self.assertEqual(
+                citation.full_span(), expected_citation.full_span()
+            )
+            self.assertEqual(citation.metadata, expected_citation.metadata)
+        self.assertEqual(
+            citations[0].corrected_citation_full(),
+            expected[0].corrected_citation_full(),
+        )
+
+        cache = MemoryCache()
+        for _ in range(2):
+            citations = get_citations(text, cache=cache, detach=True)
+            self.assertEqual(
+                [repr(citation) for citation in citations],
+                [repr(citation) for citation in expected],
+            )
+            self.assertTrue(all(c.document is None for c in citations))
+
+    def test_detach_truncated(self):
+        """Is truncation still reported when citations are detached?"""
+        text = "1 U.S. 1. Foo. 2 U.S. 2. Bar. 3 U.S. 3."
+        truncated = []
+        with self.assertLogs("eyecite.find", "WARNING"):
+            citations = get_citations(
+                text,
+                max_chars=22,
+                detach=True,
+                on_truncated=truncated.append,
+            )
+        self.assertEqual([c.matched_text() for c in citations], ["1 U.S. 1"])
+        self.assertIsNone(citations[0].document)
+        self.assertEqual(truncated, [citations])
+
+    def test_match_on_tokens_index(self):
+        """Does match_on_tokens see the same text with and without a token
+        index?"""
+        text = (Path(__file__).parent / "assets" / "opinion.txt").read_text()
+        document = Document(plain_text=text[:20000] + "\n\n" + "x " * 200)
+        document.tokenize(AhocorasickTokenizer())
+        words = document.words
+        for index in [-2, -1, 0, 1, 5, *range(50, len(words) + 2, 37)]:
+            for forward, strings_only, prefix in product(
+                [True, False], [True, False], ["", "ab ", "y" * 400]
+            ):
+                if not forward and index >= len(words):
+                    continue
+                kwargs = {
+                    "prefix": prefix,
+                    "strings_only": strings_only,
+                    "forward": forward,
+                }
+                expected = match_on_tokens(words, index, r"[\s\S]*", **kwargs)
+                actual = match_on_tokens(
+                    words,
+                    index,
+                    r"[\s\S]*",
+                    token_index=document.token_index,
+                    **kwargs,
+                )
+                self.assertEqual(actual[0], expected[0], (index, kwargs))
@@ -0,0 +1,126 @@
+import pickle
+from unittest import TestCase
+
+from eyecite import annotate_citations, get_citations, resolve_citations
+from eyecite.models import Edition, FullCitation
+from eyecite.models_slotted import from_slotted, slotted_variant, to_slotted
+from eyecite.test_factories import case_citation
+
+
+class ModelsSlottedTest(TestCase):
+    text = (
+        "Foo v. Bar, 1 U.S. 1, 2 (1999) (overruling). Id. at 3. "
+        "Bar, supra, at 4. Foo, 1 U.S. at 5. "
+        "Mass. Gen. Laws ch. 1, § 2. 1 Minn. L. Rev. 1. Lissner, 1 U.S. 1."
+    )
+
+    def test_to_slotted(self):
+        """Do slotted citations behave like the citations they copy?"""
+        for citation in get_citations(self.text):
+            slotted = to_slotted(citation)
+            with self.subTest(citation=citation):
+                self.assertFalse(hasattr(slotted, "__dict__"))
+                self.assertFalse(hasattr(slotted.metadata, "__dict__"))
+                self.assertIs(type(slotted), slotted_variant(type(citation)))
+                self.assertEqual(repr(slotted), repr(citation))
+                self.assertEqual(slotted.span(), citation.span())
+                self.assertEqual(slotted.full_span(), citation.full_span())
+                self.assertEqual(
+                    slotted.corrected_citation(),
+                    citation.corrected_citation(),
+                )
+                self.assertEqual(slotted.dump(), citation.dump())
+                if hash(citation) != id(citation):
+                    self.assertEqual(hash(slotted), hash(citation))
+
+    def test_from_slotted(self):
+        """Does converting a slotted citation back, including through
+        pickle, give an equal regular citation?"""
+        for citation in get_citations(self.text):
+            slotted = pickle.loads(pickle.dumps(to_slotted(citation)))
+            restored = from_slotted(slotted)
+            with self.subTest(citation=citation):
+                self.assertIs(type(restored), type(citation))
+                self.assertIs(type(restored.metadata), type(citation.metadata))
+                self.assertEqual(
+                    vars(restored.metadata), vars(citation.metadata)
+                )
+                self.assertEqual(repr(restored), repr(citation))
+                if hash(citation) != id(citation):
+                    self.assertEqual(restored, citation)
+
+    def test_slotted_methods(self):
+        """Do the methods copied from the original classes, including the
+        generated __init__ and those calling super(), work on variants?"""
+        for citation in get_citations(self.text):
+            if not isinstance(citation, FullCitation):
+                continue
+            variant = slotted_variant(type(citation))
+            slotted = variant(
+                citation.token,
+                citation.index,
+                exact_editions=citation.exact_editions,
+                variation_editions=citation.variation_editions,
+            )
+            with self.subTest(citation=citation):
+                self.assertIs(
+                    type(slotted.metadata), slotted_variant(citation.Metadata)
+                )
+                slotted.document = citation.document
+                slotted.add_metadata(citation.document)
+                self.assertEqual(
+                    slotted.metadata, to_slotted(citation).metadata
+                )
+                self.assertEqual(
+                    hash(slotted.metadata), hash(citation.metadata)
+                )
+                self.assertEqual(repr(slotted), repr(citation))
+                self.assertEqual(slotted, to_slotted(citation))
+
+    def test_resolve_and_annotate(self):
+        """Are slotted citations rejected by resolve_citations, resolved
+        like the originals once converted back, and annotated from their
+        spans?"""
+        citations = get_citations(self.text)
+        slotted = [to_slotted(citation) for citation in citations]
+        with self.assertRaises(TypeError):
+            resolve_citations(slotted)
+
+        def summarize(resolutions):
+            return sorted(
+                (repr(resource), [repr(c) for c in resolved])
+                for resource, resolved in resolutions.items()
+            )
+
+        expected = resolve_citations(citations)
+        self.assertTrue(expected)
+        self.assertEqual(
+            summarize(resolve_citations([from_slotted(c) for c in slotted])),
+            summarize(expected),
+        )
+        self.assertEqual(
+            annotate_citations(
+                self.text, [(c.span(), "<a>", "</a>") for c in slotted]
+            ),
+            annotate_citations(
+                self.text, [(c.span(), "<a>", "</a>") for c in citations]
+            ),
+        )
+
+    def test_slotted_variant_of_subclass(self):
+        """Are variants made on demand for citation subclasses?"""
+
+        class Subclass(type(case_citation())):  # type: ignore[misc]
+            def describe(self):
+                return f"{super().corrected_citation()}!"
+
+        citation = case_citation()
+        citation.__class__ = Subclass
+        slotted = to_slotted(citation)
+        self.assertIs(type(slotted), slotted_variant(Subclass))
+        self.assertFalse(hasattr(slotted, "__dict__"))
+        self.assertEqual(slotted.describe(), citation.describe())
+        with self.assertRaises(TypeError):
+            slotted_variant(int)
+        with self.assertRaises(TypeError):
+            slotted_variant(Edition)
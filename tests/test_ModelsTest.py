@@ -1,7 +1,7 @@
 from unittest import TestCase
 
 from eyecite import get_citations
-from eyecite.models import Resource
+from eyecite.models import Document, EmphasisTagIndex, Resource
 from eyecite.test_factories import (
     case_citation,
     id_citation,
@@ -253,3 +253,39 @@ class ModelsTest(TestCase):
                 corrected_page,
                 "Standalone page correction not working",
             )
+
+    def test_emphasis_tag_index(self):
+        """Does EmphasisTagIndex find the same tags as scanning them all?"""
+        markup = (
+            "<p><i>Foo v. Bar</i>, 1 U.S. 1. <em>Baz</em> <i></i>"
+            "<i>Qux <em>nested</em> v. Quux</i>, 2 U.S. 2.</p>"
+        )
+        document = Document(markup_text=markup, clean_steps=["html"])
+        overlapping = [("a", 0, 10), ("b", 5, 15), ("c", 12, 14)]
+        for tags in [document.emphasis_tags, overlapping]:
+            index = EmphasisTagIndex(tags)
+            for loc in range(-1, len(markup) + 1):
+                expected = [t for t in tags if t[1] <= loc < t[2]]
+                self.assertEqual(index.tags_at(loc), expected, loc)
+        self.assertTrue(document.emphasis_tag_index.disjoint)
+        self.assertFalse(EmphasisTagIndex(overlapping).disjoint)
+
+    def test_hash_invalidation(self):
+        """Are memoized hashes recomputed when the citation changes?"""
+        citation = case_citation()
+        resource = Resource(citation)
+        original_hash, resource_hash = hash(citation), hash(resource)
+        self.assertEqual(hash(citation), original_hash)
+        citation.groups["page"] = "2"
+        self.assertNotEqual(hash(citation), original_hash)
+        self.assertEqual(hash(citation), hash(case_citation(page="2")))
+        self.assertNotEqual(hash(resource), resource_hash)
+        citation.groups["page"] = "1"
+        self.assertEqual(hash(citation), original_hash)
+        self.assertEqual(hash(resource), resource_hash)
+
+        citation = get_citations("1 U.S. 1")[0]
+        corrected_hash = hash(citation)
+        citation.edition_guess = None
+        citation.groups["reporter"] = "Foo"
+        self.assertNotEqual(hash(citation), corrected_hash)
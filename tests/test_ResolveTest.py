@@ -5,7 +5,13 @@ from eyecite import get_citations
 from eyecite.find import extract_reference_citations
 from eyecite.helpers import filter_citations
 from eyecite.models import Document, FullCitation, Resource
-from eyecite.resolve import resolve_citations
+from eyecite.resolve import (
+    _resolve_reference_citation,
+    _resolve_shortcase_citation,
+    _resolve_supra_citation,
+    resolve_citations,
+    resolve_citations_batch,
+)
 
 
 def format_resolution(resolution):
@@ -19,6 +25,12 @@ def format_resolution(resolution):
     }
 
 
+def resolve_to_volume(full_citation):
+    """Resolve full citations by volume, to test custom resolvers in worker
+    processes."""
+    return full_citation.groups.get("volume")
+
+
 class ResolveTest(TestCase):
     """Tests whether different types of citations (i.e., full, short form,
     supra, id) are resolved properly."""
@@ -252,6 +264,51 @@ class ResolveTest(TestCase):
             (None, "2 F.2d, at 2."),
         )
 
+    def assertIndexedResolution(self, text):
+        """The indexed lookups of the default resolvers should match a scan
+        of a plain list, which is what they get when called from custom
+        resolvers."""
+        citations = get_citations(text)
+
+        def from_list(resolve):
+            return lambda citation, resolved_full_cites: resolve(
+                citation, list(resolved_full_cites)
+            )
+
+        self.assertEqual(
+            format_resolution(resolve_citations(citations)),
+            format_resolution(
+                resolve_citations(
+                    citations,
+                    resolve_shortcase_citation=from_list(
+                        _resolve_shortcase_citation
+                    ),
+                    resolve_supra_citation=from_list(_resolve_supra_citation),
+                    resolve_reference_citation=from_list(
+                        _resolve_reference_citation
+                    ),
+                )
+            ),
+        )
+
+    def test_short_resolution_index(self):
+        self.assertIndexedResolution(
+            "Foo v. Bar, 1 U.S. 1. Wrong v. Wrong, 1 U.S. 2. "
+            "Baz v. Qux, 2 U.S. 5. Foo v. Bar, 1 F.2d 1. "
+            "See Foo, 1 U.S., at 2. See also 2 U.S., at 6. Cf. 1 F.2d, "
+            "at 3. But see 1 U.S., at 3. Compare 3 U.S., at 4."
+        )
+
+    def test_name_resolution_index(self):
+        self.assertIndexedResolution(
+            "Foo v. Barney, 1 U.S. 1. Smith v. Jones, 2 U.S. 5. "
+            "See Barney, supra, at 2. See Bar, supra, at 3. See Ba, supra, "
+            "at 4. See Smith, supra, at 6. See Nobody, supra, at 7. "
+            "Doe v. Smithers, 3 U.S. 9. See Smith, supra, at 10. "
+            "In Jones at 6, we said. In Barney at 3, we said. "
+            "In Doe at 12, we said."
+        )
+
     def test_ambigous_short_cite(self):
         self.checkResolution(
             (0, "Foo v. Bar, 1 U.S. 1."),
@@ -386,3 +443,47 @@ class ResolveTest(TestCase):
             # resolved
         ):
             self.checkReferenceResolution(*test_tuple)
+
+    def test_batch_resolution(self):
+        texts = {
+            "a": "Foo v. Bar, 1 U.S. 1. Id. at 2. Foo, supra, at 3.",
+            "b": "Baz v. Qux, 2 F.3d 5. Quux v. Corge, 1 U.S. 3. "
+            "2 F.3d, at 6.",
+            "c": "No citations here.",
+        }
+        batch = [(key, get_citations(text)) for key, text in texts.items()]
+        for max_workers in [1, 2]:
+            with self.subTest(max_workers=max_workers):
+                resolutions = resolve_citations_batch(
+                    batch, max_workers=max_workers
+                )
+                self.assertEqual(list(resolutions), list(texts))
+                for key, citations in batch:
+                    expected = resolve_citations(citations)
+                    self.assertEqual(
+                        format_resolution(resolutions[key]),
+                        format_resolution(expected),
+                    )
+                    # the caller's citations are returned
+                    for resource, resolved in resolutions[key].items():
+                        self.assertIs(resource.citation, resolved[0])
+                        self.assertEqual(
+                            [id(c) for c in resolved],
+                            [id(c) for c in expected[resource]],
+                        )
+
+                resolutions = resolve_citations_batch(
+                    batch,
+                    max_workers=max_workers,
+                    resolve_full_citation=resolve_to_volume,
+                )
+                self.assertEqual(
+                    {
+                        resource: [c.matched_text() for c in resolved]
+                        for resource, resolved in resolutions["b"].items()
+                    },
+                    {
+                        "2": ["2 F.3d 5", "2 F.3d, at 6"],
+                        "1": ["1 U.S. 3"],
+                    },
+                )
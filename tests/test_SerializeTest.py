@@ -0,0 +1,223 @@
+import json
+from datetime import datetime
+from unittest import TestCase
+from unittest.mock import patch
+
+from eyecite import get_citations
+from eyecite.models import Edition, Reporter, Token
+from eyecite.models_extended import (
+    ConstitutionCitation,
+    JournalArticleCitation,
+    RegulationCitation,
+)
+from eyecite.serialize import (
+    FORMAT_VERSION,
+    _editions_by_name,
+    _pack,
+    _unpack,
+    citation_from_dict,
+    citation_to_dict,
+    dumps_jsonl,
+    dumps_msgpack,
+    edition_from_key,
+    edition_key,
+    loads_jsonl,
+    loads_msgpack,
+)
+from eyecite.tokenizers import EDITIONS_LOOKUP
+from eyecite.tokenizers_extended import default_extended_tokenizer
+
+
+class SerializeTest(TestCase):
+    text = (
+        "Foo v. Bar, 1 U.S. 1, 2 (1999) (overruling). Foo, 1 U.S. at 5. "
+        "Id. at 3. Bar, supra, at 4. Mass. Gen. Laws ch. 1, § 2. "
+        "1 Minn. L. Rev. 1. Lissner, 1 U.S. 1. 1 Wash. 1 (1791). See § 4."
+    )
+
+    def get_citations(self):
+        citations = get_citations(self.text)
+        citations += get_citations(
+            "See U.S. Const. art. I, § 8; 42 C.F.R. § 482.12; "
+            "doi:10.1000/182.",
+            tokenizer=default_extended_tokenizer,
+        )
+        return citations + [
+            ConstitutionCitation(
+                Token("Cal. Const. art. I", 0, 18),
+                0,
+                jurisdiction="California",
+                article="I",
+                metadata={"article": "I"},
+            ),
+            RegulationCitation(
+                Token("42 C.F.R. 1", 0, 11),
+                1,
+                reporter="C.F.R.",
+                title="42",
+                jurisdiction=None,  # type: ignore[arg-type]
+            ),
+            JournalArticleCitation(
+                Token("1 Harv. L. Rev. 1", 0, 17),
+                2,
+                volume="1",
+                reporter="Harv. L. Rev.",
+                page="1",
+                year="1999",
+            ),
+        ]
+
+    def assertSameCitations(self, loaded, citations):
+        self.assertEqual(len(loaded), len(citations))
+        for citation, expected in zip(loaded, citations):
+            with self.subTest(citation=expected):
+                self.assertIs(type(citation), type(expected))
+                self.assertIsNone(citation.document)
+                self.assertEqual(repr(citation), repr(expected))
+                self.assertEqual(citation.dump(), expected.dump())
+                self.assertEqual(citation.token, expected.token)
+                self.assertEqual(citation.token.groups, expected.token.groups)
+                self.assertEqual(citation.span(), expected.span())
+                self.assertEqual(citation.full_span(), expected.full_span())
+                self.assertEqual(citation.metadata, expected.metadata)
+                for name in expected.__dataclass_fields__:
+                    if name != "document":
+                        self.assertEqual(
+                            getattr(citation, name), getattr(expected, name)
+                        )
+                if hash(expected) != id(expected):
+                    self.assertEqual(citation, expected)
+
+    def test_jsonl(self):
+        """Do citations round-trip through JSON Lines?"""
+        citations = self.get_citations()
+        data = dumps_jsonl(citations)
+        lines = data.splitlines()
+        self.assertEqual(len(lines), len(citations) + 1)
+        self.assertEqual(
+            json.loads(lines[0]),
+            {"format": "eyecite.citations", "version": FORMAT_VERSION},
+        )
+        self.assertSameCitations(loads_jsonl(data), citations)
+        self.assertSameCitations(loads_jsonl(iter(lines)), citations)
+
+    def test_msgpack(self):
+        """Do citations round-trip through MessagePack?"""
+        citations = self.get_citations()
+        data = dumps_msgpack(citations)
+        self.assertSameCitations(loads_msgpack(data), citations)
+
+    def test_citation_dict(self):
+        """Are citations stored with editions by short name, and without
+        default values?"""
+        citation = get_citations("Foo v. Bar, 1 U.S. 1, 2 (1999)")[0]
+        data = citation_to_dict(citation)
+        self.assertEqual(data["type"], "FullCaseCitation")
+        self.assertEqual(data["exact_editions"], ["U.S."])
+        self.assertEqual(data["edition_guess"], "U.S.")
+        self.assertEqual(data["token"]["exact_editions"], ["U.S."])
+        self.assertEqual(data["metadata"]["pin_cite"], "2")
+        self.assertNotIn("court", data["token"])
+        self.assertNotIn("document", data)
+        self.assertEqual(citation_from_dict(data), citation)
+
+    def test_edition_keys(self):
+        """Do edition keys identify editions that share a short name, and
+        editions that aren't in reporters-db?"""
+        editions = {
+            edition
+            for editions in EDITIONS_LOOKUP.values()
+            for edition in editions
+        }
+        keys = set()
+        for edition in editions:
+            key = edition_key(edition)
+            self.assertEqual(edition_from_key(key), edition)
+            keys.add(json.dumps(key))
+        self.assertEqual(len(keys), len(editions))
+        self.assertEqual(edition_key(EDITIONS_LOOKUP["F.2d"][0]), "F.2d")
+        wash = EDITIONS_LOOKUP["Wash."][0]
+        self.assertEqual(
+            edition_key(wash),
+            ["Wash.", wash.reporter.name, wash.start.isoformat()],
+        )
+
+        # keys don't depend on the order of editions in reporters-db
+        reordered = {
+            name: tuple(reversed(editions))
+            for name, editions in _editions_by_name().items()
+        }
+        with patch(
+            "eyecite.serialize._editions_by_name", return_value=reordered
+        ):
+            for edition in editions:
+                self.assertEqual(
+                    edition_from_key(
+                        json.loads(json.dumps(edition_key(edition)))
+                    ),
+                    edition,
+                )
+        with self.assertRaises(ValueError):
+            edition_from_key(["Wash.", "Not a reporter", None])
+
+        custom = Edition(
+            reporter=Reporter("Custom", "Custom Reports", "state", "custom"),
+            short_name="Custom",
+            start=datetime(1900, 1, 1),
+            end=None,
+        )
+        self.assertIsInstance(edition_key(custom), dict)
+        self.assertEqual(edition_from_key(edition_key(custom)), custom)
+        with self.assertRaises(ValueError):
+            edition_from_key("Not a reporter")
+
+    def test_versions(self):
+        """Is data from another format version rejected?"""
+        data = dumps_jsonl(get_citations(self.text)).splitlines()
+        with self.assertRaises(ValueError):
+            loads_jsonl("")
+        with self.assertRaises(ValueError):
+            loads_jsonl(data[1:])
+        header = {"format": "eyecite.citations", "version": 0}
+        with self.assertRaises(ValueError):
+            loads_jsonl([json.dumps(header)] + data[1:])
+        for invalid in [b"", b"\xc1", b"\x91", b"\xc0\xc0", b"\xa5abc"]:
+            with self.assertRaises(ValueError):
+                loads_msgpack(invalid)
+        header = {"format": "eyecite.citations", "version": FORMAT_VERSION}
+        for payload in [
+            header,
+            {**header, "citations": 1},
+            {**header, "citations": [1]},
+        ]:
+            out = bytearray()
+            _pack(payload, out)
+            with self.assertRaises(ValueError):
+                loads_msgpack(bytes(out))
+        # maps keyed by an array and by a map
+        for key in [b"\x90", b"\x80"]:
+            with self.assertRaises(ValueError):
+                loads_msgpack(b"\x81" + key + b"\xc0")
+
+    def test_msgpack_encoding(self):
+        """Does the MessagePack encoding match the specification?"""
+        values = [
+            ({"a": [1, -1, None, True]}, b"\x81\xa1a\x94\x01\xff\xc0\xc3"),
+            (200, b"\xce\x00\x00\x00\xc8"),
+            (-200, b"\xd2\xff\xff\xff\x38"),
+            (2**40, b"\xd3\x00\x00\x01\x00\x00\x00\x00\x00"),
+            (2**63 - 1, b"\xd3\x7f" + b"\xff" * 7),
+            (-(2**63), b"\xd3\x80" + b"\x00" * 7),
+            (1.5, b"\xcb\x3f\xf8\x00\x00\x00\x00\x00\x00"),
+            ("é" * 20, b"\xd9\x28" + "é".encode() * 20),
+            (list(range(16)), b"\xdc\x00\x10" + bytes(range(16))),
+        ]
+        for value in [2**63, -(2**63) - 1, object()]:
+            with self.assertRaises(TypeError):
+                _pack(value, bytearray())
+        for value, encoded in values:
+            with self.subTest(value=value):
+                out = bytearray()
+                _pack(value, out)
+                self.assertEqual(bytes(out), encoded)
+                self.assertEqual(_unpack(encoded, 0), (value, len(encoded)))
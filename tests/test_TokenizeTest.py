@@ -101,3 +101,12 @@ class TokenizerTest(TestCase):
         extractors = AhocorasickTokenizer().get_extractors(text)
         extractor_strings = {tuple(e.strings) for e in extractors if e.strings}
         self.assertEqual(expected_strings, extractor_strings)
+
+    def test_limits(self):
+        """Do deadline and max_chars cut tokenization short?"""
+        text = "See foo, 123 U.S. 456. Id."
+        words, citation_tokens = default_tokenizer.tokenize(text, deadline=0)
+        self.assertEqual(citation_tokens, [])
+        words, citation_tokens = default_tokenizer.tokenize(text, max_chars=20)
+        self.assertEqual("".join(map(str, words)), "See foo, 123 U.S.")
+        self.assertEqual([str(t) for _, t in citation_tokens], ["See"])
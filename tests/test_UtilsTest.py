@@ -1,8 +1,16 @@
 import re
+from io import BytesIO, StringIO
 from textwrap import dedent
 from unittest import TestCase
 
 from eyecite import clean_text, get_citations
+from eyecite.clean import (
+    clean_text_with_diff,
+    compile_clean_steps,
+    compose_diff_steps,
+    html,
+    iter_html_text,
+)
 from eyecite.utils import dump_citations
 
 
@@ -28,6 +36,86 @@ class UtilsTest(TestCase):
             )
             print("✓")
 
+    def test_clean_text_with_diff(self):
+        """The cleaned text should match clean_text, and the diff steps
+        should keep exactly the characters that survived cleaning."""
+        text = "<?xml v?>  __word \t\n  word__  <i>x</i>\u200b"
+        for steps in (
+            ["inline_whitespace"],
+            ["all_whitespace"],
+            ["underscores"],
+            ["xml"],
+            ["xml", "underscores", "all_whitespace"],
+            ["xml", "html", "inline_whitespace"],
+            ["inline_whitespace", str.upper, str.lower, "underscores"],
+        ):
+            with self.subTest(steps=steps):
+                cleaned_text, diff_steps = clean_text_with_diff(text, steps)
+                self.assertEqual(cleaned_text, clean_text(text, steps))
+                before = after = 0
+                for operation, amount in diff_steps:
+                    if operation == "=":
+                        self.assertEqual(
+                            text[before : before + amount],
+                            cleaned_text[after : after + amount],
+                        )
+                    if operation in "=-":
+                        before += amount
+                    if operation in "=+":
+                        after += amount
+                self.assertEqual(
+                    (before, after), (len(text), len(cleaned_text))
+                )
+
+    def test_compose_diff_steps(self):
+        # "abcd" -> "abXcd" -> "aXd"
+        self.assertEqual(
+            compose_diff_steps(
+                [("=", 2), ("+", 1), ("=", 2)],
+                [("=", 1), ("-", 1), ("=", 1), ("-", 1), ("=", 1)],
+            ),
+            [("=", 1), ("-", 1), ("+", 1), ("-", 1), ("=", 1)],
+        )
+
+    def test_iter_html_text(self):
+        """Streamed text should match the html cleaner, however the markup
+        is split into chunks."""
+        markup = dedent(
+            """
+            <html><head><title>Title</title><style>p {}</style></head>
+            <body><p>foo <i>1 U.S. 1</i> bar<!-- comment --> baz</p>
+            <script>var x;</script>qux &amp; <page-number>2</page-number>
+            quux<br>corge<?pi x?>grault</body></html>
+            """
+        )
+        expected = html(markup)
+        for content in (
+            markup,
+            [markup[i : i + 5] for i in range(0, len(markup), 5)],
+            StringIO(markup),
+            BytesIO(markup.encode()),
+        ):
+            with self.subTest(content=type(content)):
+                self.assertEqual("".join(iter_html_text(content)), expected)
+
+    def test_compile_clean_steps(self):
+        """Fused runs of regex cleaners should match applying each step in
+        turn."""
+        text = "<p>a __ b\t \n c_d  ___\u200b\xa0e</p>  _ \t"
+        for steps in (
+            ["inline_whitespace", "underscores"],
+            ["underscores", "inline_whitespace"],
+            ["underscores", "all_whitespace", "inline_whitespace"],
+            ["html", "inline_whitespace", "underscores"],
+            ["all_whitespace", str.upper, "underscores", "underscores"],
+            ["xml", "underscores", "all_whitespace"],
+        ):
+            with self.subTest(steps=steps):
+                expected = text
+                for step in steps:
+                    expected = clean_text(expected, [step])
+                self.assertEqual(compile_clean_steps(steps)(text), expected)
+
     def test_clean_text_invalid(self):
         with self.assertRaises(ValueError):
             clean_text("foo", ["invalid"])